@@ -1,4 +1,8 @@
 class BasicAgent:
+    # Slots keep per-instance memory small for agents that opt in;
+    # subclasses without their own __slots__ still get a __dict__.
+    __slots__ = ('name', 'metadata')
+
     def __init__(self, name, metadata):
         self.name = name
         self.metadata = metadata
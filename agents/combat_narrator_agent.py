@@ -1,53 +1,387 @@
 import json
-import random
 import logging
+import random
+import sys
+import threading
+import time
+from random import randrange
+from string import Formatter
 from agents.basic_agent import BasicAgent
-from utils.azure_file_storage import AzureFileStorageManager
+from utils.azure_file_storage import AzureFileStorageManager, get_shared_manager
+
+# Narration templates, hoisted to module scope so each call only formats the
+# varying fields instead of rebuilding every dict and f-string.
+# Placeholders: {a}=attacker, {dn}=defender, {w}=weapon, {d}=damage,
+# {m}=special move, {e}=environmental effect.
+_ATTACK_TEMPLATES = {
+    "epic": (
+        "{a}'s {w} sings through the air, finding its mark for {d} damage!",
+        "With legendary skill, {a} strikes {dn} for {d} damage!",
+        "The battle rages as {a} lands a decisive blow for {d} damage!"
+    ),
+    "brutal": (
+        "{a} savagely attacks with their {w}, dealing {d} damage!",
+        "Blood sprays as {a}'s {w} tears into {dn} for {d} damage!",
+        "{a} shows no mercy, inflicting {d} damage!"
+    ),
+    "tactical": (
+        "{a} exploits an opening, dealing {d} damage with their {w}.",
+        "Calculated strike: {a} hits {dn} for {d} damage.",
+        "Precision attack lands for {d} damage."
+    ),
+    "dramatic": (
+        "Time slows as {a}'s {w} connects, dealing {d} damage!",
+        "The clash of steel! {a} strikes for {d} damage!",
+        "Destiny unfolds as {a} wounds {dn} for {d} damage!"
+    ),
+    "humorous": (
+        "{a} bonks {dn} for {d} damage. Ouch!",
+        "That's gotta hurt! {d} damage from {a}!",
+        "{dn} definitely felt that one - {d} damage!"
+    )
+}
+
+_DEFENSE_TEMPLATES = {
+    "epic": "{dn} heroically blocks the attack!",
+    "brutal": "{dn} barely deflects the savage blow!",
+    "tactical": "{dn} anticipates and counters the attack.",
+    "dramatic": "Against all odds, {dn} stands firm!",
+    "humorous": "{dn} says 'Not today!' and blocks!"
+}
+
+_CRITICAL_TEMPLATES = {
+    "epic": "CRITICAL STRIKE! {a} unleashes devastating power for {d} damage!",
+    "brutal": "CRUSHING BLOW! {a} deals {d} damage in a spray of blood!",
+    "tactical": "WEAK POINT EXPLOITED! {a} deals {d} critical damage!",
+    "dramatic": "THE FATES ALIGN! {a}'s critical hit deals {d} damage!",
+    "humorous": "BOOM! HEADSHOT! {d} critical damage! That's a lot of damage!"
+}
+
+_MISS_TEMPLATES = {
+    "epic": "{a}'s attack whistles past {dn}!",
+    "brutal": "{a} swings wildly and misses!",
+    "tactical": "{dn} evades {a}'s calculated strike.",
+    "dramatic": "Fate intervenes! The attack misses by a hair's breadth!",
+    "humorous": "Whoosh! {a} hits nothing but air!"
+}
+
+_DEATH_TEMPLATES = {
+    "epic": "{dn} falls in glorious battle! Their legend will be remembered!",
+    "brutal": "{dn} collapses in a pool of blood. The battle is won.",
+    "tactical": "Target eliminated. {dn} has been neutralized.",
+    "dramatic": "With a final breath, {dn} falls. The battlefield grows quiet.",
+    "humorous": "{dn} has left the chat. Permanently."
+}
+
+_VICTORY_TEMPLATES = {
+    "epic": "{a} stands victorious! Songs will be sung of this triumph!",
+    "brutal": "{a} stands over their fallen foe, victorious and bloodied!",
+    "tactical": "Mission accomplished. {a} has achieved victory.",
+    "dramatic": "Against all odds, {a} emerges victorious!",
+    "humorous": "{a} wins! Time for the victory dance!"
+}
+
+_SPECIAL_MOVE_TEMPLATES = {
+    "epic": "{a} unleashes {m}! The very earth trembles! {d} damage!",
+    "brutal": "{a}'s {m} tears through everything! {d} damage!",
+    "tactical": "Special technique deployed: {m}. Damage: {d}.",
+    "dramatic": "Power surges as {a} releases {m}! {d} damage!",
+    "humorous": "{a} goes SUPER SAIYAN with {m}! It's over {d}!"
+}
+
+_ENVIRONMENTAL_TEMPLATES = {
+    "epic": "The battlefield itself joins the fight! {e} affects all combatants!",
+    "brutal": "Nature shows no mercy! {e} ravages the battlefield!",
+    "tactical": "Environmental factor: {e} now in play.",
+    "dramatic": "The very elements conspire! {e} changes everything!",
+    "humorous": "Mother Nature enters the chat with {e}!"
+}
+
+# Environmental flavor suffixes, replacing the per-call if/elif chain
+_WEATHER_FLAVOR = {"rain": " Rain streams down the combatants."}
+_LOCATION_FLAVOR = {"dungeon": " Echoes fill the dark corridors."}
+
+
+# Damage values cluster around small integers, so their string forms are
+# precomputed once; anything outside the table falls back to str()
+_DMG_STR = tuple(str(i) for i in range(1000))
+
+
+def _dmg(damage):
+    """Return the cached string form of a damage value when possible"""
+    if type(damage) is int and 0 <= damage < 1000:
+        return _DMG_STR[damage]
+    return str(damage)
+
+
+def _names(attacker, defender):
+    """Resolve attacker/defender display names and weapon in one place"""
+    return (attacker.get('name', 'The attacker'),
+            defender.get('name', 'the defender'),
+            attacker.get('weapon', 'sword'))
+
+
+def _dumps(obj, _encode=json.dumps, _separators=(',', ':')):
+    """Compact JSON encode through a pre-bound reference; callers upstream
+    expect agent results as strings, so the encode itself has to stay."""
+    return _encode(obj, separators=_separators)
+
+
+_RAW_TEMPLATES = {
+    "attack": _ATTACK_TEMPLATES,
+    "defend": _DEFENSE_TEMPLATES,
+    "critical": _CRITICAL_TEMPLATES,
+    "miss": _MISS_TEMPLATES,
+    "death": _DEATH_TEMPLATES,
+    "victory": _VICTORY_TEMPLATES,
+    "special_move": _SPECIAL_MOVE_TEMPLATES,
+    "environmental": _ENVIRONMENTAL_TEMPLATES
+}
+
+def _compile_template(template):
+    """Compile one template into a specialized straight-line function.
+
+    The template is parsed once with string.Formatter at import time and
+    turned into a generated function that concatenates its literal and
+    field segments directly, replacing str.format's per-call parse loop.
+    All render functions share one keyword signature so call sites can
+    pass whichever fields they have.
+    """
+    parts = []
+    for literal, field, _spec, _conv in Formatter().parse(template):
+        if literal:
+            parts.append(repr(literal))
+        if field is not None:
+            parts.append("format(%s)" % field)
+    source = "def _render(a='', w='', d='', dn='', m='', e=''):\n    return %s" % (
+        " + ".join(parts) or "''")
+    namespace = {}
+    exec(compile(source, "<combat template>", "exec"), {"format": format}, namespace)
+    return namespace["_render"]
+
+
+# Flat (event, style) -> tuple of compiled render functions. A single
+# tuple-key probe replaces the per-call two-level dict walk, and the
+# per-event fallback map replaces the .get(style, table['epic']) branch.
+_NARRATIONS = {}
+_NARRATIONS_FALLBACK = {}
+for _event, _table in _RAW_TEMPLATES.items():
+    for _style, _templates in _table.items():
+        if not isinstance(_templates, tuple):
+            _templates = (_templates,)
+        # Interning gives identity-based equality for the template strings
+        # shared between the raw tables and the compiled render map
+        _NARRATIONS[(_event, _style)] = tuple(
+            _compile_template(sys.intern(t)) for t in _templates)
+    _NARRATIONS_FALLBACK[_event] = _NARRATIONS[(_event, "epic")]
+del _event, _table, _style, _templates
+
+_DEFAULT_INSIGHTS = ("Combat is unpredictable.",)
+
+# Events that warrant a dramatic pause, and their client-side effects.
+# These are the source of truth for the registry entries built below.
+_DRAMATIC_EVENTS = frozenset({"critical", "death", "victory", "special_move"})
+_SPECIAL_EFFECTS = {
+    "critical": "screen_flash_red",
+    "death": "slow_motion",
+    "victory": "victory_fanfare",
+    "special_move": "power_aura",
+    "environmental": "weather_intensify"
+}
+
+# Declarative registry of combat events: which narrator method handles the
+# event, the kwargs it needs, whether it warrants a dramatic pause, the
+# client-side special effect, and the insight pool shown alongside it.
+_EVENT_TABLE = {
+    "attack": {
+        "narrator": "narrate_attack",
+        "needs": ("attacker", "defender", "damage", "context"),
+        "insights": (
+            "Timing your attacks can increase critical chance.",
+            "Different weapons work better against different armor types.",
+            "Combos deal increasing damage."
+        )
+    },
+    "defend": {
+        "narrator": "narrate_defense",
+        "needs": ("attacker", "defender"),
+        "insights": (
+            "Perfect blocks can stun your opponent.",
+            "Defense reduces damage but costs stamina.",
+            "Some attacks cannot be blocked."
+        )
+    },
+    "critical": {
+        "narrator": "narrate_critical",
+        "needs": ("attacker", "defender", "damage"),
+        "insights": (
+            "Critical strikes ignore armor.",
+            "Backstabs have increased critical chance.",
+            "Some skills increase critical damage."
+        )
+    },
+    "miss": {
+        "narrator": "narrate_miss",
+        "needs": ("attacker", "defender"),
+        "insights": (
+            "Accuracy decreases with fatigue.",
+            "Weather affects hit chance.",
+            "Agility improves evasion."
+        )
+    },
+    "death": {
+        "narrator": "narrate_death",
+        "needs": ("defender",),
+        "insights": _DEFAULT_INSIGHTS
+    },
+    "victory": {
+        "narrator": "narrate_victory",
+        "needs": ("attacker", "defender"),
+        "insights": _DEFAULT_INSIGHTS
+    },
+    "special_move": {
+        "narrator": "narrate_special_move",
+        "needs": ("attacker", "defender", "damage"),
+        "insights": _DEFAULT_INSIGHTS
+    },
+    "environmental": {
+        "narrator": "narrate_environmental",
+        "needs": ("context",),
+        "insights": _DEFAULT_INSIGHTS
+    }
+}
+
+for _event, _entry in _EVENT_TABLE.items():
+    _entry["pause"] = _event in _DRAMATIC_EVENTS
+    _entry["effect"] = _SPECIAL_EFFECTS.get(_event)
+del _event, _entry
+
+# Registry entry used for unrecognized combat events
+_FALLBACK_EVENT = {
+    "pause": False,
+    "effect": None,
+    "insights": _DEFAULT_INSIGHTS
+}
+
+# Attack, miss, and critical dominate the event mix in typical play, so
+# perform() checks them inline with identity compares on interned names
+# before falling back to the registry lookup. Only the known event
+# names are ever interned — caller strings outside this set would pin
+# arbitrary input in the interned-string table for the process lifetime.
+_KNOWN_EVENTS = frozenset(sys.intern(name) for name in _EVENT_TABLE)
+_EV_ATTACK = sys.intern("attack")
+_EV_MISS = sys.intern("miss")
+_EV_CRITICAL = sys.intern("critical")
+_ATTACK_ENTRY = _EVENT_TABLE["attack"]
+_MISS_ENTRY = _EVENT_TABLE["miss"]
+_CRITICAL_ENTRY = _EVENT_TABLE["critical"]
 
 class CombatNarratorAgent(BasicAgent):
-    def __init__(self):
-        self.name = 'CombatNarrator'
-        self.metadata = {
-            "name": self.name,
-            "description": "Provides dynamic narrative descriptions for combat encounters, making battles feel cinematic and impactful",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "combat_event": {
-                        "type": "string",
-                        "description": "Type of combat event",
-                        "enum": ["attack", "defend", "critical", "miss", "death", "victory", "special_move", "environmental"]
-                    },
-                    "attacker": {
-                        "type": "object",
-                        "description": "Attacker information"
-                    },
-                    "defender": {
-                        "type": "object",
-                        "description": "Defender information"
-                    },
-                    "damage": {
-                        "type": "number",
-                        "description": "Damage dealt"
-                    },
-                    "context": {
-                        "type": "object",
-                        "description": "Combat context (environment, weather, etc.)"
-                    },
-                    "user_guid": {
-                        "type": "string",
-                        "description": "User GUID for personalized combat narration"
-                    }
+    # All instance state lives in the BasicAgent slots; everything else on
+    # this class is shared, so instances carry no __dict__ at all
+    __slots__ = ()
+
+    # Combat narration styles
+    narration_styles = ("epic", "brutal", "tactical", "dramatic", "humorous")
+
+    # In-process write-through cache of per-user memory JSON,
+    # keyed by user_guid -> (fetched_at, memory_dict)
+    _memory_cache = {}
+    _memory_cache_lock = threading.Lock()
+    _MEMORY_CACHE_TTL = 30  # seconds
+    _MEMORY_CACHE_MAX = 128
+
+    # Write-coalescing: combat events arrive in bursts, so per-user stats
+    # are flushed to Azure only every _FLUSH_EVERY events or
+    # _FLUSH_INTERVAL seconds, whichever comes first.
+    _FLUSH_EVERY = 8
+    _FLUSH_INTERVAL = 5.0  # seconds
+    _pending_writes = {}  # user_guid -> (events_since_flush, last_flush_time)
+    # Deadline timer armed whenever a write is deferred, so coalesced
+    # stats reach Azure within _FLUSH_INTERVAL even if the user goes
+    # idle before the next event would have triggered the flush
+    _flush_timer = None
+
+    # Single RNG instance shared by the class, avoiding repeated
+    # global-module state lookups on every pick
+    _rng = random.Random()
+
+    # Shared, lazily-created storage manager so constructing many agent
+    # instances doesn't repeat the Azure client/connection setup
+    _storage = None
+    _storage_lock = threading.Lock()
+
+    # The flusher owns its manager: flush() runs on a timer thread and
+    # must not move the shared singleton's context out from under a
+    # request thread that is between set_memory_context and its I/O
+    _flush_storage = None
+    _flush_run_lock = threading.Lock()
+
+    # Static JSON schema shared by every instance; nothing downstream
+    # mutates agent metadata, so one object serves them all
+    _METADATA = {
+        "name": 'CombatNarrator',
+        "description": "Provides dynamic narrative descriptions for combat encounters, making battles feel cinematic and impactful",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "combat_event": {
+                    "type": "string",
+                    "description": "Type of combat event",
+                    "enum": ["attack", "defend", "critical", "miss", "death", "victory", "special_move", "environmental"]
+                },
+                "attacker": {
+                    "type": "object",
+                    "description": "Attacker information"
+                },
+                "defender": {
+                    "type": "object",
+                    "description": "Defender information"
                 },
-                "required": ["combat_event"]
-            }
+                "damage": {
+                    "type": "number",
+                    "description": "Damage dealt"
+                },
+                "context": {
+                    "type": "object",
+                    "description": "Combat context (environment, weather, etc.)"
+                },
+                "user_guid": {
+                    "type": "string",
+                    "description": "User GUID for personalized combat narration"
+                }
+            },
+            "required": ["combat_event"]
         }
-        self.storage_manager = AzureFileStorageManager()
+    }
+
+    def __init__(self):
+        self.name = 'CombatNarrator'
+        self.metadata = CombatNarratorAgent._METADATA
         super().__init__(name=self.name, metadata=self.metadata)
-        
-        # Combat narration styles
-        self.narration_styles = ["epic", "brutal", "tactical", "dramatic", "humorous"]
-    
+
+    @classmethod
+    def _get_storage(cls):
+        """Lazily create the one AzureFileStorageManager shared by the class"""
+        if cls._storage is None:
+            with cls._storage_lock:
+                if cls._storage is None:
+                    cls._storage = get_shared_manager()
+        return cls._storage
+
+    @property
+    def storage_manager(self):
+        return self._get_storage()
+
+    @classmethod
+    def _get_flush_storage(cls):
+        """Lazily create the manager used only by flush()"""
+        if cls._flush_storage is None:
+            with cls._storage_lock:
+                if cls._flush_storage is None:
+                    cls._flush_storage = AzureFileStorageManager()
+        return cls._flush_storage
+
     def perform(self, **kwargs):
         combat_event = kwargs.get('combat_event')
         attacker = kwargs.get('attacker', {})
@@ -55,247 +389,229 @@ class CombatNarratorAgent(BasicAgent):
         damage = kwargs.get('damage', 0)
         context = kwargs.get('context', {})
         user_guid = kwargs.get('user_guid')
-        
-        if user_guid:
-            self.storage_manager.set_memory_context(user_guid)
-        
+
+        # Always set the context: the manager is shared process-wide, so
+        # a guid-less call must reset to shared memory rather than
+        # inherit whatever guid the previous caller left behind
+        self.storage_manager.set_memory_context(user_guid)
+
+        # Read memory once and share it across helpers to avoid duplicate Azure reads
+        memory_data = self._read_memory(user_guid)
+
         # Get combat style preference
-        combat_style = self.get_combat_style()
-        
-        # Generate narration based on event
-        if combat_event == "attack":
-            narration = self.narrate_attack(attacker, defender, damage, combat_style, context)
-        elif combat_event == "defend":
-            narration = self.narrate_defense(attacker, defender, combat_style)
-        elif combat_event == "critical":
-            narration = self.narrate_critical(attacker, defender, damage, combat_style)
-        elif combat_event == "miss":
+        combat_style = self.get_combat_style(memory_data)
+
+        if type(combat_event) is str and combat_event in _KNOWN_EVENTS:
+            combat_event = sys.intern(combat_event)
+
+        # Fast path: the three hottest events go straight to their
+        # narrators with no registry lookup or getattr indirection
+        if combat_event is _EV_ATTACK:
+            entry = _ATTACK_ENTRY
+            narration = self.narrate_attack(
+                attacker, defender, damage, combat_style, context)
+        elif combat_event is _EV_MISS:
+            entry = _MISS_ENTRY
             narration = self.narrate_miss(attacker, defender, combat_style)
-        elif combat_event == "death":
-            narration = self.narrate_death(defender, combat_style)
-        elif combat_event == "victory":
-            narration = self.narrate_victory(attacker, defender, combat_style)
-        elif combat_event == "special_move":
-            narration = self.narrate_special_move(attacker, defender, damage, combat_style)
-        elif combat_event == "environmental":
-            narration = self.narrate_environmental(context, combat_style)
+        elif combat_event is _EV_CRITICAL:
+            entry = _CRITICAL_ENTRY
+            narration = self.narrate_critical(
+                attacker, defender, damage, combat_style)
         else:
-            narration = self.generate_generic_combat_text(combat_event, combat_style)
-        
+            # Generate narration via the event registry
+            entry = _EVENT_TABLE.get(combat_event)
+            if entry is not None:
+                args = {"attacker": attacker, "defender": defender,
+                        "damage": damage, "context": context}
+                narration = getattr(self, entry['narrator'])(
+                    style=combat_style, **{k: args[k] for k in entry['needs']})
+            else:
+                entry = _FALLBACK_EVENT
+                narration = self.generate_generic_combat_text(combat_event, combat_style)
+
         # Add combat tips or flavor
-        combat_insight = self.generate_combat_insight(combat_event, context)
-        
-        # Update combat statistics
-        self.update_combat_stats(combat_event, damage)
-        
-        return json.dumps({
+        insights = entry['insights']
+        combat_insight = insights[randrange(len(insights))]
+
+        # Update combat statistics and write the shared memory back once
+        self.update_combat_stats(combat_event, damage, memory_data)
+        self._write_memory(user_guid, memory_data)
+
+        return _dumps({
             "status": "success",
             "narration": narration,
             "combat_insight": combat_insight,
             "style": combat_style,
-            "dramatic_pause": self.should_dramatic_pause(combat_event),
+            "dramatic_pause": entry['pause'],
             "camera_shake": damage > 20,
-            "special_effect": self.get_special_effect(combat_event)
+            "special_effect": entry['effect']
         })
-    
-    def get_combat_style(self):
-        """Get player's preferred combat narration style"""
+
+    def _read_memory(self, user_guid):
+        """Read memory JSON, serving hot users from the in-process cache"""
+        if not user_guid:
+            return self.storage_manager.read_json()
+        now = time.monotonic()
+        with self._memory_cache_lock:
+            entry = self._memory_cache.get(user_guid)
+            if entry:
+                pending = self._pending_writes.get(user_guid, (0, now))[0]
+                # Entries with unflushed writes stay live past the TTL so
+                # coalesced stats are never re-read stale from Azure
+                if pending or now - entry[0] < self._MEMORY_CACHE_TTL:
+                    return entry[1]
         memory_data = self.storage_manager.read_json()
+        with self._memory_cache_lock:
+            if len(self._memory_cache) >= self._MEMORY_CACHE_MAX:
+                # Only clean entries are eviction candidates: dropping a
+                # guid with coalesced unflushed stats would lose them,
+                # since flush() only writes guids still in the cache. If
+                # everything is dirty the cache briefly overshoots the
+                # cap — the deadline flush clears it within the interval.
+                clean = [guid for guid in self._memory_cache
+                         if not self._pending_writes.get(guid, (0, 0))[0]]
+                if clean:
+                    oldest = min(clean, key=lambda k: self._memory_cache[k][0])
+                    del self._memory_cache[oldest]
+                    self._pending_writes.pop(oldest, None)
+            self._memory_cache[user_guid] = (now, memory_data)
+        return memory_data
+
+    def _write_memory(self, user_guid, memory_data):
+        """Record the memory write, coalescing bursts into fewer Azure PUTs"""
+        if not user_guid:
+            self.storage_manager.write_json(memory_data)
+            return
+        now = time.monotonic()
+        with self._memory_cache_lock:
+            self._memory_cache[user_guid] = (now, memory_data)
+            pending = self._pending_writes.get(user_guid)
+            if pending is not None:
+                count, last_flush = pending
+                count += 1
+                if count < self._FLUSH_EVERY and now - last_flush < self._FLUSH_INTERVAL:
+                    self._pending_writes[user_guid] = (count, last_flush)
+                    self._arm_flush_timer()
+                    return
+            self._pending_writes[user_guid] = (0, now)
+        self.storage_manager.write_json(memory_data)
+
+    def _arm_flush_timer(self):
+        """Schedule a deadline flush for deferred writes (lock held)"""
+        cls = CombatNarratorAgent
+        if cls._flush_timer is None:
+            timer = threading.Timer(cls._FLUSH_INTERVAL, self._deadline_flush)
+            timer.daemon = True
+            timer.start()
+            cls._flush_timer = timer
+
+    def _deadline_flush(self):
+        with self._memory_cache_lock:
+            CombatNarratorAgent._flush_timer = None
+        try:
+            self.flush()
+        except Exception as e:
+            logging.error(f"Error in deadline combat stats flush: {str(e)}")
+
+    def flush(self):
+        """Write any coalesced per-user memory updates to Azure immediately"""
+        with self._memory_cache_lock:
+            dirty = [(guid, self._memory_cache[guid][1])
+                     for guid, (count, _) in self._pending_writes.items()
+                     if count and guid in self._memory_cache]
+            for guid, _ in dirty:
+                self._pending_writes.pop(guid, None)
+        # Write through the flusher's own manager so the shared
+        # singleton's context is never moved from the timer thread
+        sm = self._get_flush_storage()
+        with self._flush_run_lock:
+            for guid, memory_data in dirty:
+                sm.set_memory_context(guid)
+                sm.write_json(memory_data)
+
+    def get_combat_style(self, memory_data):
+        """Get player's preferred combat narration style"""
         preferences = memory_data.get('preferences', {})
-        return preferences.get('combat_style', random.choice(self.narration_styles))
-    
+        style = preferences.get('combat_style')
+        if style is None:
+            styles = self.narration_styles
+            style = styles[randrange(len(styles))]
+        return style
+
     def narrate_attack(self, attacker, defender, damage, style, context):
         """Generate attack narration"""
-        weapon = attacker.get('weapon', 'sword')
-        attacker_name = attacker.get('name', 'The attacker')
-        defender_name = defender.get('name', 'the defender')
-        
-        narrations = {
-            "epic": [
-                f"{attacker_name}'s {weapon} sings through the air, finding its mark for {damage} damage!",
-                f"With legendary skill, {attacker_name} strikes {defender_name} for {damage} damage!",
-                f"The battle rages as {attacker_name} lands a decisive blow for {damage} damage!"
-            ],
-            "brutal": [
-                f"{attacker_name} savagely attacks with their {weapon}, dealing {damage} damage!",
-                f"Blood sprays as {attacker_name}'s {weapon} tears into {defender_name} for {damage} damage!",
-                f"{attacker_name} shows no mercy, inflicting {damage} damage!"
-            ],
-            "tactical": [
-                f"{attacker_name} exploits an opening, dealing {damage} damage with their {weapon}.",
-                f"Calculated strike: {attacker_name} hits {defender_name} for {damage} damage.",
-                f"Precision attack lands for {damage} damage."
-            ],
-            "dramatic": [
-                f"Time slows as {attacker_name}'s {weapon} connects, dealing {damage} damage!",
-                f"The clash of steel! {attacker_name} strikes for {damage} damage!",
-                f"Destiny unfolds as {attacker_name} wounds {defender_name} for {damage} damage!"
-            ],
-            "humorous": [
-                f"{attacker_name} bonks {defender_name} for {damage} damage. Ouch!",
-                f"That's gotta hurt! {damage} damage from {attacker_name}!",
-                f"{defender_name} definitely felt that one - {damage} damage!"
-            ]
-        }
-        
-        style_narrations = narrations.get(style, narrations['epic'])
-        base_narration = random.choice(style_narrations)
-        
+        attacker_name, defender_name, weapon = _names(attacker, defender)
+
+        renders = _NARRATIONS.get(("attack", style)) or _NARRATIONS_FALLBACK["attack"]
+        base_narration = renders[randrange(len(renders))](
+            a=attacker_name, w=weapon, d=_dmg(damage), dn=defender_name)
+
         # Add environmental flavor
-        if context.get('weather') == 'rain':
-            base_narration += " Rain streams down the combatants."
-        elif context.get('location') == 'dungeon':
-            base_narration += " Echoes fill the dark corridors."
-        
+        flavor = (_WEATHER_FLAVOR.get(context.get('weather')) or
+                  _LOCATION_FLAVOR.get(context.get('location')))
+        if flavor:
+            base_narration += flavor
+
         return base_narration
-    
+
     def narrate_defense(self, attacker, defender, style):
         """Generate defense narration"""
         defender_name = defender.get('name', 'The defender')
-        
-        narrations = {
-            "epic": f"{defender_name} heroically blocks the attack!",
-            "brutal": f"{defender_name} barely deflects the savage blow!",
-            "tactical": f"{defender_name} anticipates and counters the attack.",
-            "dramatic": f"Against all odds, {defender_name} stands firm!",
-            "humorous": f"{defender_name} says 'Not today!' and blocks!"
-        }
-        
-        return narrations.get(style, narrations['epic'])
-    
+        render = (_NARRATIONS.get(("defend", style)) or _NARRATIONS_FALLBACK["defend"])[0]
+        return render(dn=defender_name)
+
     def narrate_critical(self, attacker, defender, damage, style):
         """Generate critical hit narration"""
         attacker_name = attacker.get('name', 'The attacker')
-        
-        narrations = {
-            "epic": f"CRITICAL STRIKE! {attacker_name} unleashes devastating power for {damage} damage!",
-            "brutal": f"CRUSHING BLOW! {attacker_name} deals {damage} damage in a spray of blood!",
-            "tactical": f"WEAK POINT EXPLOITED! {attacker_name} deals {damage} critical damage!",
-            "dramatic": f"THE FATES ALIGN! {attacker_name}'s critical hit deals {damage} damage!",
-            "humorous": f"BOOM! HEADSHOT! {damage} critical damage! That's a lot of damage!"
-        }
-        
-        return narrations.get(style, narrations['epic'])
-    
+        render = (_NARRATIONS.get(("critical", style)) or _NARRATIONS_FALLBACK["critical"])[0]
+        return render(a=attacker_name, d=_dmg(damage))
+
     def narrate_miss(self, attacker, defender, style):
         """Generate miss narration"""
-        attacker_name = attacker.get('name', 'The attacker')
-        defender_name = defender.get('name', 'the defender')
-        
-        narrations = {
-            "epic": f"{attacker_name}'s attack whistles past {defender_name}!",
-            "brutal": f"{attacker_name} swings wildly and misses!",
-            "tactical": f"{defender_name} evades {attacker_name}'s calculated strike.",
-            "dramatic": f"Fate intervenes! The attack misses by a hair's breadth!",
-            "humorous": f"Whoosh! {attacker_name} hits nothing but air!"
-        }
-        
-        return narrations.get(style, narrations['epic'])
-    
+        attacker_name, defender_name, _ = _names(attacker, defender)
+        render = (_NARRATIONS.get(("miss", style)) or _NARRATIONS_FALLBACK["miss"])[0]
+        return render(a=attacker_name, dn=defender_name)
+
     def narrate_death(self, defender, style):
         """Generate death narration"""
         defender_name = defender.get('name', 'The defender')
-        
-        narrations = {
-            "epic": f"{defender_name} falls in glorious battle! Their legend will be remembered!",
-            "brutal": f"{defender_name} collapses in a pool of blood. The battle is won.",
-            "tactical": f"Target eliminated. {defender_name} has been neutralized.",
-            "dramatic": f"With a final breath, {defender_name} falls. The battlefield grows quiet.",
-            "humorous": f"{defender_name} has left the chat. Permanently."
-        }
-        
-        return narrations.get(style, narrations['epic'])
-    
+        render = (_NARRATIONS.get(("death", style)) or _NARRATIONS_FALLBACK["death"])[0]
+        return render(dn=defender_name)
+
     def narrate_victory(self, attacker, defender, style):
         """Generate victory narration"""
         attacker_name = attacker.get('name', 'The victor')
-        
-        narrations = {
-            "epic": f"{attacker_name} stands victorious! Songs will be sung of this triumph!",
-            "brutal": f"{attacker_name} stands over their fallen foe, victorious and bloodied!",
-            "tactical": f"Mission accomplished. {attacker_name} has achieved victory.",
-            "dramatic": f"Against all odds, {attacker_name} emerges victorious!",
-            "humorous": f"{attacker_name} wins! Time for the victory dance!"
-        }
-        
-        return narrations.get(style, narrations['epic'])
-    
+        render = (_NARRATIONS.get(("victory", style)) or _NARRATIONS_FALLBACK["victory"])[0]
+        return render(a=attacker_name)
+
     def narrate_special_move(self, attacker, defender, damage, style):
         """Generate special move narration"""
         move_name = attacker.get('special_move', 'special attack')
         attacker_name = attacker.get('name', 'The attacker')
-        
-        narrations = {
-            "epic": f"{attacker_name} unleashes {move_name}! The very earth trembles! {damage} damage!",
-            "brutal": f"{attacker_name}'s {move_name} tears through everything! {damage} damage!",
-            "tactical": f"Special technique deployed: {move_name}. Damage: {damage}.",
-            "dramatic": f"Power surges as {attacker_name} releases {move_name}! {damage} damage!",
-            "humorous": f"{attacker_name} goes SUPER SAIYAN with {move_name}! It's over {damage}!"
-        }
-        
-        return narrations.get(style, narrations['epic'])
-    
+        render = (_NARRATIONS.get(("special_move", style)) or _NARRATIONS_FALLBACK["special_move"])[0]
+        return render(a=attacker_name, m=move_name, d=_dmg(damage))
+
     def narrate_environmental(self, context, style):
         """Generate environmental combat effect narration"""
         effect = context.get('effect', 'environmental hazard')
-        
-        narrations = {
-            "epic": f"The battlefield itself joins the fight! {effect} affects all combatants!",
-            "brutal": f"Nature shows no mercy! {effect} ravages the battlefield!",
-            "tactical": f"Environmental factor: {effect} now in play.",
-            "dramatic": f"The very elements conspire! {effect} changes everything!",
-            "humorous": f"Mother Nature enters the chat with {effect}!"
-        }
-        
-        return narrations.get(style, narrations['epic'])
-    
+        render = (_NARRATIONS.get(("environmental", style)) or _NARRATIONS_FALLBACK["environmental"])[0]
+        return render(e=effect)
+
     def generate_combat_insight(self, combat_event, context):
         """Generate tactical insights or tips"""
-        insights = {
-            "attack": [
-                "Timing your attacks can increase critical chance.",
-                "Different weapons work better against different armor types.",
-                "Combos deal increasing damage."
-            ],
-            "defend": [
-                "Perfect blocks can stun your opponent.",
-                "Defense reduces damage but costs stamina.",
-                "Some attacks cannot be blocked."
-            ],
-            "critical": [
-                "Critical strikes ignore armor.",
-                "Backstabs have increased critical chance.",
-                "Some skills increase critical damage."
-            ],
-            "miss": [
-                "Accuracy decreases with fatigue.",
-                "Weather affects hit chance.",
-                "Agility improves evasion."
-            ]
-        }
-        
-        event_insights = insights.get(combat_event, ["Combat is unpredictable."])
-        return random.choice(event_insights)
-    
+        insights = _EVENT_TABLE.get(combat_event, _FALLBACK_EVENT)['insights']
+        return insights[randrange(len(insights))]
+
     def should_dramatic_pause(self, combat_event):
         """Determine if this moment needs a dramatic pause"""
-        dramatic_events = ["critical", "death", "victory", "special_move"]
-        return combat_event in dramatic_events
-    
+        return combat_event in _DRAMATIC_EVENTS
+
     def get_special_effect(self, combat_event):
         """Get special visual/audio effect for the event"""
-        effects = {
-            "critical": "screen_flash_red",
-            "death": "slow_motion",
-            "victory": "victory_fanfare",
-            "special_move": "power_aura",
-            "environmental": "weather_intensify"
-        }
-        return effects.get(combat_event, None)
-    
-    def update_combat_stats(self, combat_event, damage):
-        """Track combat statistics"""
-        memory_data = self.storage_manager.read_json()
+        return _SPECIAL_EFFECTS.get(combat_event)
+
+    def update_combat_stats(self, combat_event, damage, memory_data):
+        """Track combat statistics in the already-loaded memory dict"""
         combat_stats = memory_data.get('combat_stats', {
             'total_damage_dealt': 0,
             'total_damage_taken': 0,
@@ -305,7 +621,7 @@ class CombatNarratorAgent(BasicAgent):
             'defeats': 0,
             'special_moves_used': 0
         })
-        
+
         if combat_event == "attack":
             combat_stats['total_damage_dealt'] += damage
         elif combat_event == "critical":
@@ -320,10 +636,51 @@ class CombatNarratorAgent(BasicAgent):
         elif combat_event == "special_move":
             combat_stats['special_moves_used'] += 1
             combat_stats['total_damage_dealt'] += damage
-        
+
         memory_data['combat_stats'] = combat_stats
-        self.storage_manager.write_json(memory_data)
-    
+
+    def update_combat_stats_batch(self, events, memory_data):
+        """Aggregate a burst of (combat_event, damage) pairs in one pass
+
+        Accumulates into plain local counters and merges them into the
+        stats dict once, instead of paying a dict read-modify-write per
+        event as the single-event path does.
+        """
+        combat_stats = memory_data.get('combat_stats', {
+            'total_damage_dealt': 0,
+            'total_damage_taken': 0,
+            'critical_hits': 0,
+            'misses': 0,
+            'victories': 0,
+            'defeats': 0,
+            'special_moves_used': 0
+        })
+
+        damage_dealt = crits = misses = victories = defeats = specials = 0
+        for combat_event, damage in events:
+            if combat_event == "attack":
+                damage_dealt += damage
+            elif combat_event == "critical":
+                crits += 1
+                damage_dealt += damage
+            elif combat_event == "miss":
+                misses += 1
+            elif combat_event == "victory":
+                victories += 1
+            elif combat_event == "death":
+                defeats += 1
+            elif combat_event == "special_move":
+                specials += 1
+                damage_dealt += damage
+
+        combat_stats['total_damage_dealt'] += damage_dealt
+        combat_stats['critical_hits'] += crits
+        combat_stats['misses'] += misses
+        combat_stats['victories'] += victories
+        combat_stats['defeats'] += defeats
+        combat_stats['special_moves_used'] += specials
+        memory_data['combat_stats'] = combat_stats
+
     def generate_generic_combat_text(self, event, style):
         """Fallback for unknown combat events"""
-        return f"The battle continues with {event}!"
\ No newline at end of file
+        return f"The battle continues with {event}!"
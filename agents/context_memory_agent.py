@@ -2,7 +2,7 @@
 # From the artifact "context_memory_agent.py - Memory Recall Agent"
 import logging
 from agents.basic_agent import BasicAgent
-from utils.azure_file_storage import AzureFileStorageManager
+from utils.azure_file_storage import get_shared_manager
 
 class ContextMemoryAgent(BasicAgent):
     def __init__(self):
@@ -34,7 +34,7 @@ class ContextMemoryAgent(BasicAgent):
                 "required": []
             }
         }
-        self.storage_manager = AzureFileStorageManager()
+        self.storage_manager = get_shared_manager()
         super().__init__(name=self.name, metadata=self.metadata)
         
     def perform(self, **kwargs):
@@ -1,77 +1,348 @@
 import json
+import queue
+from bisect import bisect_right
 import random
 import logging
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
 from agents.basic_agent import BasicAgent
 from utils.azure_file_storage import AzureFileStorageManager
 
+try:
+    import orjson
+
+    def _dumps(obj):
+        """Encode a response dict with orjson (Rust-speed, no whitespace)"""
+        return orjson.dumps(obj).decode()
+except ImportError:
+    # orjson is in requirements, but fall back to compact stdlib output
+    # so the agent still works in a bare environment
+    def _dumps(obj):
+        return json.dumps(obj, separators=(',', ':'))
+
+# Error responses never vary, so they are encoded once at import
+_ERR_UNKNOWN_ACTION = _dumps({"error": "Unknown action"})
+_ERR_NO_WORLD = _dumps({"error": "No world state found"})
+_ERR_NO_FACTION = _dumps({"error": "No faction specified"})
+
+# Time-of-day event table: hour -> (event, probability). One dict probe
+# plus one random compare replaces the if/elif chain in advance_time,
+# and new hours can be added without another elif rung
+_HOURLY_EVENTS = {
+    0: ("mysterious_visitor", 0.3),     # Midnight
+    6: ("merchant_arrival", 0.2),       # Dawn
+    18: ("monster_activity_increase", 0.25)  # Dusk
+}
+
+_SEASONS = ("spring", "summer", "autumn", "winter")
+_SEASON_IDX = {season: idx for idx, season in enumerate(_SEASONS)}
+
+_FACTIONS = ("Kingdom", "Rebels", "Merchants", "Wizards", "Thieves", "Dragons")
+
+# New worlds start every faction at neutral standing; dict() of this
+# read-only template is cheaper than re-running the comprehension
+_DEFAULT_STANDINGS = MappingProxyType({faction: 50 for faction in _FACTIONS})
+
+try:
+    from numba import njit
+except ImportError:
+    # numba isn't installed everywhere; the plain-Python kernel is fine
+    # for single ticks and keeps large time-skips working regardless
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+
+@njit(cache=True)
+def _advance(time_of_day, day_count, season_idx, hours):
+    """Pure-integer time step: returns the new (hour, day, season index)"""
+    time_of_day = (time_of_day + hours) % 24
+    if time_of_day < hours:
+        day_count += 1
+        if day_count % 30 == 0:
+            season_idx = (season_idx + 1) % 4
+    return time_of_day, day_count, season_idx
+
+
+# Pre-warm so any JIT compilation happens at import, not mid-request
+_advance(12, 1, 0, 1)
+
+# describe_world_state lookups: named hours, and stability buckets
+# indexed by where the value falls among the thresholds
+_TIME_DESC = {0: "midnight", 6: "dawn", 12: "midday", 18: "dusk"}
+_STABILITY_THRESHOLDS = (25, 50, 75)
+_STABILITY_DESC = ("chaos", "unrest", "stable", "prosperous")
+
+# Canonical world_state scalar fields, merged over stored state once per
+# request so handlers can index directly instead of repeating .get
+# defaults. Read-only proxy so nothing can mutate the template. Mutable
+# containers are listed separately so each state gets fresh instances.
+_DEFAULT_STATE = MappingProxyType({
+    "time_of_day": 12,
+    "day_count": 1,
+    "weather": "clear",
+    "season": "spring",
+    "prophecy_progress": 0,
+    "world_stability": 75
+})
+_DEFAULT_LISTS = ("active_events", "world_threats", "discovered_locations")
+
+# Weather effect and event templates, frozen behind read-only proxies so
+# the per-call dict rebuilds in change_weather/generate_event_details go
+# away. Inner dicts stay plain so they serialize directly; consumers
+# copy an entry before mutating it.
+_WEATHER_EFFECTS = MappingProxyType({
+    "rain": {"visibility": -2, "fire_damage": -50, "water_magic": +20},
+    "storm": {"visibility": -4, "lightning_chance": 30, "flying_disabled": True},
+    "fog": {"visibility": -5, "stealth": +30, "ranged_accuracy": -20},
+    "snow": {"movement_speed": -20, "ice_magic": +30, "fire_resistance": -10},
+    "sandstorm": {"visibility": -3, "earth_magic": +20, "healing": -10},
+    "clear": {"visibility": 0, "all_magic": +5, "morale": +10}
+})
+
+_EVENT_TEMPLATES = MappingProxyType({
+    "merchant_caravan": {
+        "name": "Traveling Merchants",
+        "description": "A caravan of exotic merchants arrives with rare goods",
+        "duration": 3,
+        "effects": {"trade_prices": -20, "rare_items_available": True}
+    },
+    "dragon_sighting": {
+        "name": "Ancient Dragon Awakens",
+        "description": "An ancient dragon has been spotted terrorizing the countryside",
+        "duration": 10,
+        "effects": {"danger_level": +50, "heroic_quests_available": True}
+    },
+    "festival": {
+        "name": "Harvest Festival",
+        "description": "The kingdom celebrates with a grand festival",
+        "duration": 2,
+        "effects": {"happiness": +20, "trade_bonus": +10}
+    },
+    "portal_opening": {
+        "name": "Dimensional Rift",
+        "description": "A mysterious portal opens to another dimension",
+        "duration": 5,
+        "effects": {"magic_instability": +30, "rare_creatures_spawn": True}
+    }
+})
+
+# Entity templates, hoisted so spawn_entity copies one entry instead of
+# rebuilding the whole table; bandit level stays randomized per spawn
+_ENTITY_TYPES = {
+    "merchant": {"icon": "🧑‍💼", "friendly": True, "trades": True},
+    "dragon": {"icon": "🐉", "friendly": False, "boss": True, "level": 50},
+    "wanderer": {"icon": "🧙", "friendly": True, "quest_giver": True},
+    "bandit": {"icon": "🗡️", "friendly": False},
+    "treasure": {"icon": "💰", "lootable": True},
+    "portal": {"icon": "🌀", "teleport": True}
+}
+_ENTITY_KEYS = tuple(_ENTITY_TYPES)
+
+# Market price ranges, hoisted so generate_market_prices only does the
+# random draws instead of rebuilding the item table every call
+_PRICE_RANGES = (
+    ("health_potion", 40, 60),
+    ("mana_potion", 25, 40),
+    ("iron_sword", 80, 120),
+    ("leather_armor", 60, 90),
+    ("magic_scroll", 150, 250),
+    ("food", 5, 15)
+)
+
 class GameWorldAgent(BasicAgent):
-    def __init__(self):
-        self.name = 'GameWorld'
-        self.metadata = {
-            "name": self.name,
-            "description": "Manages the game world state, environment, weather, time cycles, and global events in Runecraft 3D",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "action": {
-                        "type": "string",
-                        "description": "The world action to perform",
-                        "enum": ["get_world_state", "advance_time", "change_weather", "trigger_event", "update_faction", "spawn_entity"]
-                    },
-                    "parameters": {
-                        "type": "object",
-                        "description": "Parameters for the specific action"
-                    },
-                    "user_guid": {
-                        "type": "string",
-                        "description": "User GUID for world state management"
-                    }
+    # World state templates, shared across instances so each __init__
+    # reuses the same pre-built structures instead of rebuilding them
+    weather_types = ("clear", "rain", "storm", "fog", "snow", "sandstorm")
+    world_events = (
+        "merchant_caravan", "bandit_attack", "dragon_sighting",
+        "meteor_shower", "magical_anomaly", "festival", "plague_outbreak",
+        "treasure_discovery", "portal_opening", "ancient_awakening"
+    )
+    factions = _FACTIONS
+
+    # The metadata schema is static, so it is built once here and shared
+    _METADATA = {
+        "name": "GameWorld",
+        "description": "Manages the game world state, environment, weather, time cycles, and global events in Runecraft 3D",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "action": {
+                    "type": "string",
+                    "description": "The world action to perform",
+                    "enum": ["get_world_state", "advance_time", "change_weather", "trigger_event", "update_faction", "spawn_entity"]
                 },
-                "required": ["action"]
-            }
+                "parameters": {
+                    "type": "object",
+                    "description": "Parameters for the specific action"
+                },
+                "user_guid": {
+                    "type": "string",
+                    "description": "User GUID for world state management"
+                }
+            },
+            "required": ["action"]
         }
-        self.storage_manager = AzureFileStorageManager()
+    }
+
+    # How long the flush thread waits after a mutation so that bursts of
+    # writes collapse into a single PUT of the latest state
+    _FLUSH_DELAY = 0.5  # seconds
+
+    # Write-behind queue and its flush thread are process-wide: the
+    # agent cache re-instantiates agents every AGENTS_CACHE_TTL, and a
+    # per-instance thread would leak one parked thread (plus its pinned
+    # instance) per refresh. Started lazily by the first __init__.
+    _write_queue = queue.Queue()
+    _flush_thread = None
+    _flush_thread_lock = threading.Lock()
+
+    # Storage managers already set to a user's context, keyed by
+    # user_guid, so alternating users don't repeat the context setup
+    # (and its Azure existence check) on every call
+    _CTX_CACHE = OrderedDict()
+    _CTX_CACHE_MAX = 128
+
+    # Guid-less calls use a dedicated manager pinned to the shared
+    # context: the process-wide singleton's context moves with other
+    # agents, so both the immediate reads and the entries sitting in
+    # the write-behind queue would otherwise land under whichever guid
+    # another agent switched it to in the meantime
+    _shared_sm = None
+    _shared_sm_lock = threading.Lock()
+
+    def __init__(self):
+        self.name = 'GameWorld'
+        self.metadata = GameWorldAgent._METADATA
+        self.storage_manager = self._get_shared_storage()
         super().__init__(name=self.name, metadata=self.metadata)
-        
-        # World state templates
-        self.weather_types = ["clear", "rain", "storm", "fog", "snow", "sandstorm"]
-        self.world_events = [
-            "merchant_caravan", "bandit_attack", "dragon_sighting", 
-            "meteor_shower", "magical_anomaly", "festival", "plague_outbreak",
-            "treasure_discovery", "portal_opening", "ancient_awakening"
-        ]
-        self.factions = ["Kingdom", "Rebels", "Merchants", "Wizards", "Thieves", "Dragons"]
-        
+
+        # Write-behind: mutated world state is queued and flushed by the
+        # shared background thread, so perform() returns without
+        # blocking on the Azure PUT
+        self._ensure_flush_thread()
+
+        # Bound-method dispatch table: one dict probe per perform() with
+        # no getattr resolution on the hot path
+        self._dispatch = {
+            "get_world_state": self.get_world_state,
+            "advance_time": self.advance_time,
+            "change_weather": self.change_weather,
+            "trigger_event": self.trigger_event,
+            "update_faction": self.update_faction_standing,
+            "spawn_entity": self.spawn_entity
+        }
+
+    @classmethod
+    def _get_shared_storage(cls):
+        """Lazily create the manager pinned to the shared memory context"""
+        if cls._shared_sm is None:
+            with cls._shared_sm_lock:
+                if cls._shared_sm is None:
+                    cls._shared_sm = AzureFileStorageManager()
+        return cls._shared_sm
+
+    def _get_sm(self, user_guid):
+        """Return a storage manager already set to the user's context"""
+        if not user_guid:
+            return self.storage_manager
+        cache = GameWorldAgent._CTX_CACHE
+        sm = cache.get(user_guid)
+        if sm is None:
+            sm = AzureFileStorageManager()
+            sm.set_memory_context(user_guid)
+            cache[user_guid] = sm
+            if len(cache) > self._CTX_CACHE_MAX:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(user_guid)
+        return sm
+
     def perform(self, **kwargs):
         action = kwargs.get('action', 'get_world_state')
         parameters = kwargs.get('parameters', {})
         user_guid = kwargs.get('user_guid')
-        
-        if user_guid:
-            self.storage_manager.set_memory_context(user_guid)
-        
-        if action == "get_world_state":
-            return self.get_world_state()
-        elif action == "advance_time":
-            return self.advance_time(parameters)
-        elif action == "change_weather":
-            return self.change_weather(parameters)
-        elif action == "trigger_event":
-            return self.trigger_event(parameters)
-        elif action == "update_faction":
-            return self.update_faction_standing(parameters)
-        elif action == "spawn_entity":
-            return self.spawn_entity(parameters)
-        else:
-            return json.dumps({"error": "Unknown action"})
-    
-    def get_world_state(self):
+
+        sm = self._get_sm(user_guid)
+
+        handler = self._dispatch.get(action)
+        if handler is None:
+            return _ERR_UNKNOWN_ACTION
+
+        # Read once, hand the same dict to the handler, and write back only
+        # when it reports a mutation; this halves the Azure round-trips for
+        # every action and skips the PUT entirely on read-only ones
+        memory_data = sm.read_json()
+
+        # Normalize existing state once so handlers index fields directly;
+        # an empty/missing state stays empty so first-run detection in
+        # get_world_state and advance_time still works
+        world_state = memory_data.get('world_state')
+        if world_state:
+            for key, value in _DEFAULT_STATE.items():
+                world_state.setdefault(key, value)
+            for key in _DEFAULT_LISTS:
+                world_state.setdefault(key, [])
+            world_state.setdefault('faction_standings', {})
+
+        response, dirty = handler(parameters, memory_data)
+        if dirty:
+            self._write_queue.put((sm, memory_data))
+        return response
+
+    @classmethod
+    def _ensure_flush_thread(cls):
+        """Start the process-wide flush thread once, on first use"""
+        if cls._flush_thread is not None:
+            return
+        with cls._flush_thread_lock:
+            if cls._flush_thread is None:
+                thread = threading.Thread(target=cls._flush_loop, daemon=True)
+                thread.start()
+                cls._flush_thread = thread
+
+    @classmethod
+    def _flush_loop(cls):
+        """Drain queued world-state writes, coalescing bursts into one PUT"""
+        while True:
+            sm, memory_data = cls._write_queue.get()
+            # Brief pause lets rapid successive mutations collapse into a
+            # single write of the latest state per storage context
+            time.sleep(cls._FLUSH_DELAY)
+            pending = {sm: memory_data}
+            while True:
+                try:
+                    sm, memory_data = cls._write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                pending[sm] = memory_data
+            for sm, memory_data in pending.items():
+                try:
+                    sm.write_json(memory_data)
+                except Exception as e:
+                    logging.error(f"Error flushing world state: {str(e)}")
+
+    def flush(self):
+        """Write any still-queued world state immediately (shutdown path)"""
+        pending = {}
+        while True:
+            try:
+                sm, memory_data = self._write_queue.get_nowait()
+            except queue.Empty:
+                break
+            pending[sm] = memory_data
+        for sm, memory_data in pending.items():
+            sm.write_json(memory_data)
+
+    def get_world_state(self, parameters, memory_data):
         """Get current world state from memory or generate new"""
-        memory_data = self.storage_manager.read_json()
-        
         world_state = memory_data.get('world_state', {})
-        
+        dirty = False
+
         if not world_state:
             # Generate initial world state
             world_state = {
@@ -80,7 +351,7 @@ class GameWorldAgent(BasicAgent):
                 "weather": "clear",
                 "season": "spring",
                 "active_events": [],
-                "faction_standings": {faction: 50 for faction in self.factions},
+                "faction_standings": dict(_DEFAULT_STANDINGS),
                 "world_threats": [],
                 "discovered_locations": [],
                 "global_market_prices": self.generate_market_prices(),
@@ -90,250 +361,217 @@ class GameWorldAgent(BasicAgent):
             
             # Save initial state
             memory_data['world_state'] = world_state
-            self.storage_manager.write_json(memory_data)
-        
-        return json.dumps({
+            dirty = True
+
+        return _dumps({
             "status": "success",
             "world_state": world_state,
             "description": self.describe_world_state(world_state)
-        })
-    
-    def advance_time(self, parameters):
+        }), dirty
+
+    def advance_time(self, parameters, memory_data):
         """Advance game time and trigger time-based events"""
         hours = parameters.get('hours', 1)
-        
-        memory_data = self.storage_manager.read_json()
+
         world_state = memory_data.get('world_state', {})
-        
+
         if not world_state:
-            return json.dumps({"error": "No world state found"})
-        
-        # Advance time
-        world_state['time_of_day'] = (world_state.get('time_of_day', 12) + hours) % 24
-        
-        # Check for day change
-        if world_state['time_of_day'] < hours:
-            world_state['day_count'] = world_state.get('day_count', 1) + 1
-            
-            # Season change every 30 days
-            if world_state['day_count'] % 30 == 0:
-                seasons = ["spring", "summer", "autumn", "winter"]
-                current_season_idx = seasons.index(world_state.get('season', 'spring'))
-                world_state['season'] = seasons[(current_season_idx + 1) % 4]
-        
+            return _ERR_NO_WORLD, False
+        
+        # Advance time, day, and season through the integer kernel
+        season_idx = _SEASON_IDX.get(world_state['season'], 0)
+        new_time, new_day, new_season_idx = _advance(
+            world_state['time_of_day'], world_state['day_count'], season_idx, hours)
+        world_state['time_of_day'] = new_time
+        world_state['day_count'] = new_day
+        if new_season_idx != season_idx:
+            world_state['season'] = _SEASONS[new_season_idx]
+
+        # Carry forward events that still have days left; anything
+        # triggered with a created_day/duration stamp expires here instead
+        # of accumulating in the blob forever. Plain-string events are
+        # per-tick flavor and always roll off.
+        day_count = world_state['day_count']
+        active_events = [
+            ev for ev in world_state['active_events']
+            if isinstance(ev, dict)
+            and ev.get('created_day', day_count) + ev.get('duration', 1) >= day_count
+        ]
+
         # Random events based on time
         events = []
-        if world_state['time_of_day'] == 0:  # Midnight
-            if random.random() < 0.3:
-                events.append("mysterious_visitor")
-        elif world_state['time_of_day'] == 6:  # Dawn
-            if random.random() < 0.2:
-                events.append("merchant_arrival")
-        elif world_state['time_of_day'] == 18:  # Dusk
-            if random.random() < 0.25:
-                events.append("monster_activity_increase")
-        
-        world_state['active_events'] = events
-        
-        # Save updated state
+        hourly = _HOURLY_EVENTS.get(world_state['time_of_day'])
+        if hourly is not None and random.random() < hourly[1]:
+            events.append(hourly[0])
+
+        world_state['active_events'] = active_events + events
+
         memory_data['world_state'] = world_state
-        self.storage_manager.write_json(memory_data)
-        
-        return json.dumps({
+
+        return _dumps({
             "status": "success",
             "time_of_day": world_state['time_of_day'],
             "day_count": world_state['day_count'],
             "season": world_state['season'],
             "triggered_events": events,
             "description": f"Time advances to hour {world_state['time_of_day']} of day {world_state['day_count']} in {world_state['season']}."
-        })
-    
-    def change_weather(self, parameters):
+        }), True
+
+    def change_weather(self, parameters, memory_data):
         """Change weather conditions with effects on gameplay"""
         new_weather = parameters.get('weather')
-        
+
         if not new_weather:
             new_weather = random.choice(self.weather_types)
-        
-        memory_data = self.storage_manager.read_json()
+
         world_state = memory_data.get('world_state', {})
-        
+
         old_weather = world_state.get('weather', 'clear')
+        # Re-requesting the current weather changes nothing, so skip the PUT
+        dirty = new_weather != old_weather or 'weather' not in world_state
         world_state['weather'] = new_weather
-        
-        # Weather effects
-        effects = {
-            "rain": {"visibility": -2, "fire_damage": -50, "water_magic": +20},
-            "storm": {"visibility": -4, "lightning_chance": 30, "flying_disabled": True},
-            "fog": {"visibility": -5, "stealth": +30, "ranged_accuracy": -20},
-            "snow": {"movement_speed": -20, "ice_magic": +30, "fire_resistance": -10},
-            "sandstorm": {"visibility": -3, "earth_magic": +20, "healing": -10},
-            "clear": {"visibility": 0, "all_magic": +5, "morale": +10}
-        }
-        
-        weather_effects = effects.get(new_weather, {})
-        
+
+        weather_effects = _WEATHER_EFFECTS.get(new_weather, {})
+
         memory_data['world_state'] = world_state
-        self.storage_manager.write_json(memory_data)
-        
-        return json.dumps({
+
+        return _dumps({
             "status": "success",
             "old_weather": old_weather,
             "new_weather": new_weather,
             "weather_effects": weather_effects,
             "description": f"The weather shifts from {old_weather} to {new_weather}."
-        })
-    
-    def trigger_event(self, parameters):
+        }), dirty
+
+    def trigger_event(self, parameters, memory_data):
         """Trigger a world event that affects gameplay"""
         event_type = parameters.get('event_type')
-        
+
         if not event_type:
             event_type = random.choice(self.world_events)
-        
-        memory_data = self.storage_manager.read_json()
+
         world_state = memory_data.get('world_state', {})
         
         # Generate event details based on type
         event_data = self.generate_event_details(event_type, world_state)
         
-        # Add to active events
+        # Add to active events, stamped so advance_time can expire it
+        event_data['created_day'] = world_state.get('day_count', 1)
         active_events = world_state.get('active_events', [])
         active_events.append(event_data)
+        # Keep only the most recent events so the blob stays bounded
+        if len(active_events) > 16:
+            del active_events[:-16]
         world_state['active_events'] = active_events
         
         # Apply event effects to world
+        stability = world_state.get('world_stability', 75)
         if event_type == "dragon_sighting":
-            world_state['world_threats'] = world_state.get('world_threats', [])
-            world_state['world_threats'].append("ancient_dragon")
-            world_state['world_stability'] = max(0, world_state.get('world_stability', 75) - 10)
+            world_state.setdefault('world_threats', []).append("ancient_dragon")
+            stability = max(0, stability - 10)
         elif event_type == "festival":
-            world_state['world_stability'] = min(100, world_state.get('world_stability', 75) + 5)
+            stability = min(100, stability + 5)
         elif event_type == "plague_outbreak":
-            world_state['world_stability'] = max(0, world_state.get('world_stability', 75) - 15)
+            stability = max(0, stability - 15)
+        world_state['world_stability'] = stability
         
         memory_data['world_state'] = world_state
-        self.storage_manager.write_json(memory_data)
-        
-        return json.dumps({
+
+        return _dumps({
             "status": "success",
             "event": event_data,
             "world_stability": world_state['world_stability'],
             "description": event_data.get('description', f"A {event_type} occurs!")
-        })
-    
-    def update_faction_standing(self, parameters):
+        }), True
+
+    def update_faction_standing(self, parameters, memory_data):
         """Update faction relationships and standings"""
         faction = parameters.get('faction')
         change = parameters.get('change', 0)
-        
+
         if not faction:
-            return json.dumps({"error": "No faction specified"})
-        
-        memory_data = self.storage_manager.read_json()
+            return _ERR_NO_FACTION, False
+
         world_state = memory_data.get('world_state', {})
         faction_standings = world_state.get('faction_standings', {})
         
         old_standing = faction_standings.get(faction, 50)
         new_standing = max(0, min(100, old_standing + change))
+        # A clamped-out or zero change leaves the standing as it was
+        dirty = new_standing != old_standing or faction not in faction_standings
         faction_standings[faction] = new_standing
         
         # Faction relationship effects
         consequences = []
         if new_standing < 20:
             consequences.append(f"{faction} becomes hostile")
-            world_state['world_threats'] = world_state.get('world_threats', [])
-            world_state['world_threats'].append(f"{faction}_hostility")
+            world_state.setdefault('world_threats', []).append(f"{faction}_hostility")
+            dirty = True
         elif new_standing > 80:
             consequences.append(f"{faction} offers alliance")
-        
+
         world_state['faction_standings'] = faction_standings
         memory_data['world_state'] = world_state
-        self.storage_manager.write_json(memory_data)
-        
-        return json.dumps({
+
+        return _dumps({
             "status": "success",
             "faction": faction,
             "old_standing": old_standing,
             "new_standing": new_standing,
             "consequences": consequences,
             "description": f"Your standing with {faction} changes from {old_standing} to {new_standing}."
-        })
-    
-    def spawn_entity(self, parameters):
+        }), dirty
+
+    def spawn_entity(self, parameters, memory_data):
         """Spawn a new entity in the world"""
         entity_type = parameters.get('type', 'random')
-        location = parameters.get('location', {'x': random.randint(0, 100), 'y': random.randint(0, 100)})
-        
-        entity_types = {
-            "merchant": {"icon": "🧑‍💼", "friendly": True, "trades": True},
-            "dragon": {"icon": "🐉", "friendly": False, "boss": True, "level": 50},
-            "wanderer": {"icon": "🧙", "friendly": True, "quest_giver": True},
-            "bandit": {"icon": "🗡️", "friendly": False, "level": random.randint(5, 15)},
-            "treasure": {"icon": "💰", "lootable": True},
-            "portal": {"icon": "🌀", "teleport": True}
-        }
-        
+        location = parameters.get('location')
+        if location is None:
+            # One RNG draw supplies both coordinates instead of two
+            # separate randint calls (and is skipped entirely when the
+            # caller passes a location); 32 bits per axis keeps the
+            # modulo reduction effectively uniform over 0-100
+            r = random.getrandbits(64)
+            location = {'x': (r & 0xFFFFFFFF) % 101, 'y': (r >> 32) % 101}
+
         if entity_type == "random":
-            entity_type = random.choice(list(entity_types.keys()))
-        
-        entity_data = entity_types.get(entity_type, {})
+            entity_type = _ENTITY_KEYS[random.randrange(len(_ENTITY_KEYS))]
+
+        # Copy the shared template so per-spawn fields don't leak into it
+        entity_data = dict(_ENTITY_TYPES.get(entity_type, ()))
+        if entity_type == "bandit":
+            entity_data['level'] = random.randint(5, 15)
         entity_data['type'] = entity_type
         entity_data['location'] = location
-        entity_data['id'] = f"{entity_type}_{datetime.now().timestamp()}"
+        # time_ns is far cheaper than building a datetime and keeps ids
+        # unique across function restarts, unlike a bare counter
+        entity_data['id'] = f"{entity_type}_{time.time_ns()}"
         
-        return json.dumps({
+        return _dumps({
             "status": "success",
             "entity": entity_data,
             "description": f"A {entity_type} appears at location ({location['x']}, {location['y']})"
-        })
+        }), False
     
     def generate_event_details(self, event_type, world_state):
         """Generate detailed event information"""
-        event_templates = {
-            "merchant_caravan": {
-                "name": "Traveling Merchants",
-                "description": "A caravan of exotic merchants arrives with rare goods",
-                "duration": 3,
-                "effects": {"trade_prices": -20, "rare_items_available": True}
-            },
-            "dragon_sighting": {
-                "name": "Ancient Dragon Awakens",
-                "description": "An ancient dragon has been spotted terrorizing the countryside",
-                "duration": 10,
-                "effects": {"danger_level": +50, "heroic_quests_available": True}
-            },
-            "festival": {
-                "name": "Harvest Festival",
-                "description": "The kingdom celebrates with a grand festival",
-                "duration": 2,
-                "effects": {"happiness": +20, "trade_bonus": +10}
-            },
-            "portal_opening": {
-                "name": "Dimensional Rift",
-                "description": "A mysterious portal opens to another dimension",
-                "duration": 5,
-                "effects": {"magic_instability": +30, "rare_creatures_spawn": True}
-            }
-        }
-        
-        return event_templates.get(event_type, {
+        template = _EVENT_TEMPLATES.get(event_type)
+        if template is not None:
+            # Copy so trigger_event's created_day stamp and any later
+            # edits never touch the shared template
+            return dict(template)
+
+        return {
             "name": event_type.replace("_", " ").title(),
             "description": f"A {event_type} event occurs",
             "duration": random.randint(1, 5),
             "effects": {}
-        })
+        }
     
     def generate_market_prices(self):
         """Generate dynamic market prices"""
-        return {
-            "health_potion": random.randint(40, 60),
-            "mana_potion": random.randint(25, 40),
-            "iron_sword": random.randint(80, 120),
-            "leather_armor": random.randint(60, 90),
-            "magic_scroll": random.randint(150, 250),
-            "food": random.randint(5, 15)
-        }
+        randint = random.randint
+        return {item: randint(lo, hi) for item, lo, hi in _PRICE_RANGES}
     
     def describe_world_state(self, world_state):
         """Generate a narrative description of the world state"""
@@ -342,7 +580,7 @@ class GameWorldAgent(BasicAgent):
         season = world_state.get('season', 'spring')
         stability = world_state.get('world_stability', 75)
         
-        time_desc = "midnight" if time == 0 else "dawn" if time == 6 else "midday" if time == 12 else "dusk" if time == 18 else f"{time}:00"
-        stability_desc = "chaos" if stability < 25 else "unrest" if stability < 50 else "stable" if stability < 75 else "prosperous"
+        time_desc = _TIME_DESC.get(time) or f"{time}:00"
+        stability_desc = _STABILITY_DESC[bisect_right(_STABILITY_THRESHOLDS, stability)]
         
         return f"It is {time_desc} on day {world_state.get('day_count', 1)} of {season}. The weather is {weather}. The world is in a state of {stability_desc}."
\ No newline at end of file
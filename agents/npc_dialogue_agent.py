@@ -1,11 +1,198 @@
 import json
 import random
 import logging
-from datetime import datetime  # Added missing import
+import time
+from collections import namedtuple
+from types import MappingProxyType
 from agents.basic_agent import BasicAgent
-from utils.azure_file_storage import AzureFileStorageManager
+from utils.azure_file_storage import DebouncedJsonStore, get_shared_manager
+
+# orjson serializes the response payload several times faster than the
+# stdlib encoder; fall back when it isn't installed
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, separators=(',', ':'))
+
+# Static dialogue tables, built once at import instead of per call
+_PERSONALITY_TRAITS = (
+    "friendly", "suspicious", "greedy", "helpful", "mysterious",
+    "nervous", "arrogant", "wise", "cunning", "jovial"
+)
+
+_NPC_ARCHETYPES = {
+    "merchant": {
+        "greetings": ("Welcome, traveler!", "Looking to trade?", "Finest goods in the realm!"),
+        "interests": ("trade", "profit", "goods", "customers"),
+        "knowledge": ("prices", "trade_routes", "other_merchants", "rare_items")
+    },
+    "guard": {
+        "greetings": ("Halt! State your business.", "Move along, citizen.", "Keep the peace."),
+        "interests": ("order", "law", "security", "threats"),
+        "knowledge": ("crime", "wanted_criminals", "city_laws", "recent_incidents")
+    },
+    "questgiver": {
+        "greetings": ("Ah, a capable adventurer!", "Perhaps you can help...", "I have a task..."),
+        "interests": ("quests", "problems", "rewards", "heroes"),
+        "knowledge": ("local_problems", "ancient_lore", "dungeon_locations", "mysteries")
+    },
+    "innkeeper": {
+        "greetings": ("Welcome to my inn!", "Need a room?", "Ale and a bed, friend?"),
+        "interests": ("gossip", "comfort", "travelers", "local_news"),
+        "knowledge": ("rumors", "local_events", "traveler_stories", "town_history")
+    },
+    "wizard": {
+        "greetings": ("The arcane calls...", "Magic flows through all.", "Ah, I sense power in you."),
+        "interests": ("magic", "knowledge", "artifacts", "prophecies"),
+        "knowledge": ("spells", "enchantments", "magical_theory", "ancient_mysteries")
+    }
+}
+
+_DEFAULT_GREETINGS = ("Hello there.",)
+
+# Flattened archetype records: one dict lookup and attribute access on
+# the hot path instead of chained .get() calls with default allocations
+_Archetype = namedtuple('_Archetype', ('greetings', 'interests', 'knowledge'))
+
+class _ArchetypeDict(dict):
+    """Archetype lookup whose misses yield the shared default record"""
+
+    def __missing__(self, key):
+        return _DEFAULT_ARCHETYPE
+
+_ARCHETYPE_CACHE = _ArchetypeDict(
+    (npc_type, _Archetype(spec['greetings'], spec['interests'], spec['knowledge']))
+    for npc_type, spec in _NPC_ARCHETYPES.items()
+)
+_DEFAULT_ARCHETYPE = _Archetype(_DEFAULT_GREETINGS, (), ())
+
+_PERSONALITY_MODIFIERS = {
+    "friendly": " It's so nice to meet new people!",
+    "suspicious": " You're not from around here, are you?",
+    "mysterious": " Fate brings us together, it seems.",
+    "nervous": " I-I don't usually talk to strangers...",
+    "arrogant": " I suppose you've heard of me?",
+    "wise": " I sense great potential in you, young one."
+}
+
+_FRIENDLY_GREETINGS = ('How can I help?', 'What brings you here?', 'Always a pleasure!')
+_RUDE_GREETINGS = ('What do you want?', 'Make it quick.', 'I\'m busy.')
+
+_COMPLIMENT_RESPONSES = {
+    "friendly": "Oh, how kind of you to say! You've made my day!",
+    "suspicious": "Flattery? What are you after?",
+    "arrogant": "Well, of course. I'm glad you noticed.",
+    "nervous": "Oh! Um, th-thank you... that's very nice...",
+    "wise": "Kind words cost nothing but mean everything."
+}
+
+_QUESTS = (
+    "There's been strange activity in the old ruins to the north...",
+    "Bandits have been terrorizing travelers on the eastern road.",
+    "I lost a precious family heirloom in the dark forest.",
+    "The town well has been poisoned - we need the antidote from the swamp witch.",
+    "An ancient evil stirs in the abandoned mine shaft."
+)
+
+_RAIN_RESPONSES = (
+    "Terrible weather we're having.",
+    "This rain is good for the crops, at least.",
+    "I hope this rain ends soon."
+)
+
+_BASE_OPTIONS = ("Goodbye", "Tell me about yourself", "Do you have any work for me?")
+
+_QUEST_TYPES = (
+    {"type": "fetch", "target": "ancient_artifact", "location": "ruins", "reward": 500},
+    {"type": "kill", "target": "bandit_leader", "location": "camp", "reward": 750},
+    {"type": "escort", "target": "merchant", "location": "next_town", "reward": 300},
+    {"type": "investigate", "target": "disappearances", "location": "village", "reward": 400},
+    {"type": "deliver", "target": "message", "location": "castle", "reward": 200}
+)
+
+_FIRST_NAMES = ("Aldric", "Bella", "Cedric", "Diana", "Edmund", "Fiona", "Gareth", "Helena", "Ivan", "Julia")
+_LAST_NAMES = ("Blackwood", "Riverstone", "Goldleaf", "Ironforge", "Windwalker", "Moonshire", "Starweaver")
+
+# Frozen creation tables: shared immutable pools, copied only on use
+_BACKSTORIES = MappingProxyType({
+    "merchant": (
+        "a third-generation trader from a long line of merchants",
+        "a former adventurer who settled down to sell exotic goods",
+        "a refugee who rebuilt their life through honest trade"
+    ),
+    "guard": (
+        "a veteran of the kingdom's army, now keeping the peace",
+        "a young recruit eager to prove themselves",
+        "a reformed criminal who now upholds the law"
+    ),
+    "questgiver": (
+        "a retired hero with unfinished business",
+        "a scholar researching ancient mysteries",
+        "a noble seeking help for their troubled lands"
+    ),
+    "innkeeper": (
+        "a former bard who settled down to run this establishment",
+        "the inheritor of a family business spanning generations",
+        "a worldly traveler who decided to create a home for others"
+    ),
+    "wizard": (
+        "a student of the arcane arts for over a century",
+        "an exile from the mage's college seeking redemption",
+        "a self-taught prodigy with unconventional methods"
+    )
+})
+
+_DEFAULT_BACKSTORIES = ("a simple villager living their life",)
+
+_INVENTORIES = MappingProxyType({
+    "merchant": ("health_potion", "rope", "torch", "map", "rare_gem"),
+    "guard": ("sword", "shield", "arrest_warrant", "keys"),
+    "innkeeper": ("ale", "bread", "room_key", "gossip_journal"),
+    "wizard": ("spell_scroll", "magic_crystal", "ancient_tome", "potion_ingredients")
+})
+
+_DEFAULT_INVENTORY = ("coin_purse",)
+
+_SECRETS = (
+    "I saw strange lights in the forest last night",
+    "The mayor isn't who they claim to be",
+    "There's a hidden treasure in the old well",
+    "I know where the bandits hide their loot",
+    "The blacksmith is secretly a wizard",
+    "Something evil lurks in the castle basement",
+    "I witnessed a murder but I'm too scared to report it"
+)
+
+# Emotion lookup keyed by (action, personality); the None row is the
+# per-action default, disposition decides everything else
+_EMOTION_TABLE = {
+    ("threaten", "nervous"): "afraid",
+    ("threaten", None): "angry",
+    ("compliment", "friendly"): "happy",
+    ("compliment", "suspicious"): "suspicious",
+    ("compliment", None): "pleased"
+}
+
+def _default_memory_filter(player_action, dialogue_response):
+    """Return True for interactions not worth an Azure write.
+
+    A repeat greeting that stirred no emotion changes nothing the next
+    turn will miss, so skipping it cuts write amplification on the most
+    common action.
+    """
+    return player_action == "greet" and dialogue_response.get('emotion') == 'neutral'
 
 class NPCDialogueAgent(BasicAgent):
+    # NPC personality traits
+    personality_traits = _PERSONALITY_TRAITS
+
+    # NPC archetypes with dialogue patterns
+    npc_archetypes = _NPC_ARCHETYPES
+
     def __init__(self):
         self.name = 'NPCDialogue'
         self.metadata = {
@@ -38,64 +225,41 @@ class NPCDialogueAgent(BasicAgent):
                 "required": ["npc_type"]
             }
         }
-        self.storage_manager = AzureFileStorageManager()
+        # Debounced store: chatty conversations coalesce into one PUT
+        # instead of a full-blob upload per dialogue line
+        self.storage_manager = DebouncedJsonStore(get_shared_manager())
+        # Per-instance RNG: isolated state under concurrent agents and
+        # seedable for deterministic dialogue in tests
+        self._rng = random.Random()
+        # Policy hook deciding which interactions skip persistence
+        self._memory_filter = _default_memory_filter
         super().__init__(name=self.name, metadata=self.metadata)
-        
-        # NPC personality traits
-        self.personality_traits = [
-            "friendly", "suspicious", "greedy", "helpful", "mysterious",
-            "nervous", "arrogant", "wise", "cunning", "jovial"
-        ]
-        
-        # NPC archetypes with dialogue patterns
-        self.npc_archetypes = {
-            "merchant": {
-                "greetings": ["Welcome, traveler!", "Looking to trade?", "Finest goods in the realm!"],
-                "interests": ["trade", "profit", "goods", "customers"],
-                "knowledge": ["prices", "trade_routes", "other_merchants", "rare_items"]
-            },
-            "guard": {
-                "greetings": ["Halt! State your business.", "Move along, citizen.", "Keep the peace."],
-                "interests": ["order", "law", "security", "threats"],
-                "knowledge": ["crime", "wanted_criminals", "city_laws", "recent_incidents"]
-            },
-            "questgiver": {
-                "greetings": ["Ah, a capable adventurer!", "Perhaps you can help...", "I have a task..."],
-                "interests": ["quests", "problems", "rewards", "heroes"],
-                "knowledge": ["local_problems", "ancient_lore", "dungeon_locations", "mysteries"]
-            },
-            "innkeeper": {
-                "greetings": ["Welcome to my inn!", "Need a room?", "Ale and a bed, friend?"],
-                "interests": ["gossip", "comfort", "travelers", "local_news"],
-                "knowledge": ["rumors", "local_events", "traveler_stories", "town_history"]
-            },
-            "wizard": {
-                "greetings": ["The arcane calls...", "Magic flows through all.", "Ah, I sense power in you."],
-                "interests": ["magic", "knowledge", "artifacts", "prophecies"],
-                "knowledge": ["spells", "enchantments", "magical_theory", "ancient_mysteries"]
-            }
-        }
-    
+
     def perform(self, **kwargs):
         npc_name = kwargs.get('npc_name', self.generate_npc_name())
         npc_type = kwargs.get('npc_type', 'villager')
         player_action = kwargs.get('player_action', 'greet')
         context = kwargs.get('context', {})
         user_guid = kwargs.get('user_guid')
-        
-        if user_guid:
-            self.storage_manager.set_memory_context(user_guid)
-        
-        # Get or create NPC memory
-        npc_data = self.get_or_create_npc(npc_name, npc_type)
-        
+
+        # Always set the context: the underlying manager is shared
+        # process-wide, so a guid-less call must reset to shared memory
+        # rather than inherit the previous caller's guid
+        self.storage_manager.set_memory_context(user_guid)
+
+        # Get or create NPC memory from its own shard, so a dialogue turn
+        # moves only this NPC's payload instead of every NPC's memories
+        npc_data, created = self.get_or_create_npc(npc_name, npc_type)
+
         # Generate dialogue based on context
         dialogue_response = self.generate_dialogue(npc_data, player_action, context)
-        
-        # Update NPC memory with this interaction
-        self.update_npc_memory(npc_name, player_action, dialogue_response)
-        
-        return json.dumps({
+
+        # Update NPC memory with this interaction; this single write also
+        # persists a just-created NPC, so a first meeting costs one upload
+        self.update_npc_memory(npc_name, player_action, dialogue_response, npc_data,
+                               new=created)
+
+        return _dumps({
             "status": "success",
             "npc": npc_data,
             "dialogue": dialogue_response['dialogue'],
@@ -104,129 +268,204 @@ class NPCDialogueAgent(BasicAgent):
             "quest_offer": dialogue_response.get('quest_offer'),
             "trade_offer": dialogue_response.get('trade_offer')
         })
-    
+
+    def perform_batch(self, turns, user_guid=None):
+        """Run several NPC turns against one set of storage round-trips.
+
+        turns is a list of dicts with the same keys perform accepts.
+        Each NPC's shard is read once, every turn for it applied in
+        memory, and written back once at the end — a scene where
+        several NPCs react to the player costs one read and at most one
+        write per NPC instead of per turn.
+        """
+        self.storage_manager.set_memory_context(user_guid)
+
+        responses = []
+        loaded = {}  # npc_name -> [npc_data, created, dirty]
+        for turn in turns:
+            npc_name = turn.get('npc_name') or self.generate_npc_name()
+            npc_type = turn.get('npc_type', 'villager')
+            player_action = turn.get('player_action', 'greet')
+            context = turn.get('context', {})
+
+            entry = loaded.get(npc_name)
+            if entry is None:
+                npc_data, created = self.get_or_create_npc(npc_name, npc_type)
+                entry = loaded[npc_name] = [npc_data, created, created]
+            else:
+                npc_data = entry[0]
+                npc_data['interaction_count'] += 1
+
+            dialogue_response = self.generate_dialogue(npc_data, player_action, context)
+
+            if entry[1] or not self._memory_filter(player_action, dialogue_response):
+                self._record_memory(player_action, dialogue_response, npc_data)
+                entry[2] = True
+
+            responses.append({
+                "status": "success",
+                "npc": npc_data,
+                "dialogue": dialogue_response['dialogue'],
+                "emotion": dialogue_response['emotion'],
+                "options": dialogue_response.get('options', []),
+                "quest_offer": dialogue_response.get('quest_offer'),
+                "trade_offer": dialogue_response.get('trade_offer')
+            })
+
+        for npc_name, (npc_data, created, dirty) in loaded.items():
+            if dirty:
+                self.storage_manager.write_npc(npc_name, npc_data, new=created)
+
+        return _dumps(responses)
+
     def get_or_create_npc(self, npc_name, npc_type):
-        """Get existing NPC data or create new NPC"""
-        memory_data = self.storage_manager.read_json()
-        npcs = memory_data.get('npcs', {})
-        
-        if npc_name not in npcs:
+        """Get the NPC's shard, creating one in memory if it doesn't exist.
+
+        Returns (npc_data, created); a newly created NPC is not written
+        here — the caller persists it together with the first memory.
+        """
+        npc_data = self.storage_manager.read_npc(npc_name)
+
+        if npc_data is None:
+            # NPCs created before per-NPC shards lived in one monolithic
+            # 'npcs' map in the memory blob; migrate such a record into
+            # its own shard instead of recreating the character with a
+            # fresh personality and no memories
+            legacy_npcs = self.storage_manager.read_json().get('npcs')
+            if legacy_npcs and npc_name in legacy_npcs:
+                npc_data = legacy_npcs[npc_name]
+                self.storage_manager.write_npc(npc_name, npc_data, new=True)
+                npc_data['interaction_count'] = npc_data.get('interaction_count', 0) + 1
+                return npc_data, False
+
+            archetype = _ARCHETYPE_CACHE[npc_type]
             # Create new NPC with personality and backstory
             npc_data = {
                 "name": npc_name,
                 "type": npc_type,
-                "personality": random.choice(self.personality_traits),
+                "personality": self._rng.choice(_PERSONALITY_TRAITS),
                 "disposition": 50,  # Neutral starting disposition
                 "met_player": False,
                 "interaction_count": 0,
                 "memories": [],
-                "backstory": self.generate_backstory(npc_type),
+                "backstory": (backstory := self.generate_backstory(npc_type)),
+                # Precomputed first-meeting hint so greeting is pure concat
+                "backstory_hint": f" I'm {backstory.split('.', 1)[0] or backstory}.",
                 "inventory": self.generate_npc_inventory(npc_type),
-                "knowledge": self.npc_archetypes.get(npc_type, {}).get('knowledge', []),
+                "knowledge": list(archetype.knowledge),
+                # Greeting pool materialized once per NPC so greeting
+                # turns skip the archetype lookup entirely
+                "greetings": list(archetype.greetings),
                 "current_mood": "neutral",
-                "secrets": self.generate_secrets(npc_type) if random.random() < 0.3 else None
+                "secrets": self.generate_secrets(npc_type) if self._rng.random() < 0.3 else None
             }
-            npcs[npc_name] = npc_data
-            memory_data['npcs'] = npcs
-            self.storage_manager.write_json(memory_data)
+            return npc_data, True
+
+        npc_data['interaction_count'] += 1
+        return npc_data, False
+
+    def _handle_greet(self, npc_data, context):
+        greetings = npc_data.get('greetings')
+        if greetings is None:
+            # Shard written before greetings were cached on the record
+            greetings = list(_ARCHETYPE_CACHE[npc_data['type']].greetings)
+            npc_data['greetings'] = greetings
+        if not npc_data['met_player']:
+            dialogue = self.generate_first_meeting(npc_data, greetings)
+            npc_data['met_player'] = True
         else:
-            npc_data = npcs[npc_name]
-            npc_data['interaction_count'] += 1
-        
-        return npc_data
-    
+            dialogue = self.generate_greeting(npc_data, greetings, npc_data['disposition'])
+        return dialogue, None
+
+    def _handle_threaten(self, npc_data, context):
+        disposition = npc_data['disposition']
+        dialogue = self.generate_threat_response(npc_data, disposition)
+        npc_data['disposition'] = max(0, disposition - 10)
+        return dialogue, "afraid" if disposition < 30 else "angry"
+
+    def _handle_compliment(self, npc_data, context):
+        dialogue = self.generate_compliment_response(npc_data)
+        npc_data['disposition'] = min(100, npc_data['disposition'] + 5)
+        return dialogue, "happy"
+
+    def _handle_ask_quest(self, npc_data, context):
+        return self.generate_quest_dialogue(npc_data, context), None
+
+    def _handle_trade(self, npc_data, context):
+        return self.generate_trade_dialogue(npc_data), None
+
+    # O(1) action lookup instead of an if/elif chain per dialogue turn
+    _ACTION_DISPATCH = {
+        "greet": _handle_greet,
+        "threaten": _handle_threaten,
+        "compliment": _handle_compliment,
+        "ask_quest": _handle_ask_quest,
+        "trade": _handle_trade
+    }
+
     def generate_dialogue(self, npc_data, player_action, context):
         """Generate contextual dialogue based on NPC personality and situation"""
         personality = npc_data['personality']
         disposition = npc_data['disposition']
         npc_type = npc_data['type']
-        met_before = npc_data['met_player']
-        
-        # Get archetype dialogue patterns
-        archetype = self.npc_archetypes.get(npc_type, {})
-        
+
         # Determine emotion based on personality and disposition
         emotion = self.determine_emotion(personality, disposition, player_action)
-        
+
         # Generate base dialogue
-        if player_action == "greet":
-            if not met_before:
-                dialogue = self.generate_first_meeting(npc_data, archetype)
-                npc_data['met_player'] = True
-            else:
-                dialogue = self.generate_greeting(npc_data, archetype, disposition)
-        elif player_action == "threaten":
-            dialogue = self.generate_threat_response(npc_data, disposition)
-            emotion = "afraid" if disposition < 30 else "angry"
-            npc_data['disposition'] = max(0, disposition - 10)
-        elif player_action == "compliment":
-            dialogue = self.generate_compliment_response(npc_data)
-            emotion = "happy"
-            npc_data['disposition'] = min(100, disposition + 5)
-        elif player_action == "ask_quest":
-            dialogue = self.generate_quest_dialogue(npc_data, context)
-        elif player_action == "trade":
-            dialogue = self.generate_trade_dialogue(npc_data)
+        handler = self._ACTION_DISPATCH.get(player_action)
+        if handler is not None:
+            dialogue, emotion_override = handler(self, npc_data, context)
+            if emotion_override is not None:
+                emotion = emotion_override
         else:
             dialogue = self.generate_contextual_dialogue(npc_data, player_action, context)
-        
+
         # Generate response options for player
         options = self.generate_response_options(npc_data, context)
-        
+
         # Check for special offers
         response = {
             "dialogue": dialogue,
             "emotion": emotion,
             "options": options
         }
-        
+
         # Add quest offer if appropriate
         if npc_type == "questgiver" and disposition > 40:
             response["quest_offer"] = self.generate_quest_offer(npc_data, context)
-        
+
         # Add trade offer if merchant
         if npc_type == "merchant":
             response["trade_offer"] = True
-        
+
         return response
-    
-    def generate_first_meeting(self, npc_data, archetype):
+
+    def generate_first_meeting(self, npc_data, greetings):
         """Generate dialogue for first meeting"""
-        greetings = archetype.get('greetings', ["Hello there."])
-        base_greeting = random.choice(greetings)
-        
-        personality_modifiers = {
-            "friendly": " It's so nice to meet new people!",
-            "suspicious": " You're not from around here, are you?",
-            "mysterious": " Fate brings us together, it seems.",
-            "nervous": " I-I don't usually talk to strangers...",
-            "arrogant": " I suppose you've heard of me?",
-            "wise": " I sense great potential in you, young one."
-        }
-        
-        modifier = personality_modifiers.get(npc_data['personality'], "")
-        
-        # Fixed: Properly extract first sentence from backstory
-        backstory_parts = npc_data['backstory'].split('.')
-        if backstory_parts and backstory_parts[0]:
-            backstory_hint = f" I'm {backstory_parts[0]}."
-        else:
-            backstory_hint = f" I'm {npc_data['backstory']}."
-        
+        base_greeting = self._rng.choice(greetings)
+
+        modifier = _PERSONALITY_MODIFIERS.get(npc_data['personality'], "")
+
+        # Hint is precomputed at NPC creation; derive it once for shards
+        # written before backstory_hint existed
+        backstory_hint = npc_data.get('backstory_hint')
+        if backstory_hint is None:
+            backstory = npc_data['backstory']
+            backstory_hint = f" I'm {backstory.split('.', 1)[0] or backstory}."
+            npc_data['backstory_hint'] = backstory_hint
+
         return base_greeting + modifier + backstory_hint
-    
-    def generate_greeting(self, npc_data, archetype, disposition):
+
+    def generate_greeting(self, npc_data, greetings, disposition):
         """Generate greeting based on relationship"""
         if disposition > 70:
-            greeting_options = ['How can I help?', 'What brings you here?', 'Always a pleasure!']
-            return f"Ah, my friend! Good to see you again. {random.choice(greeting_options)}"
+            return f"Ah, my friend! Good to see you again. {self._rng.choice(_FRIENDLY_GREETINGS)}"
         elif disposition > 40:
-            greetings = archetype.get('greetings', ["Hello."])
-            return random.choice(greetings)
+            return self._rng.choice(greetings)
         else:
-            rude_options = ['What do you want?', 'Make it quick.', 'I\'m busy.']
-            return f"Oh, it's you. {random.choice(rude_options)}"
-    
+            return f"Oh, it's you. {self._rng.choice(_RUDE_GREETINGS)}"
+
     def generate_threat_response(self, npc_data, disposition):
         """Generate response to threats"""
         if npc_data['type'] == 'guard':
@@ -237,220 +476,165 @@ class NPCDialogueAgent(BasicAgent):
             return "Ha! You think you can threaten ME? How amusing."
         else:
             return "Back off! I'm warning you!"
-    
+
     def generate_compliment_response(self, npc_data):
         """Generate response to compliments"""
-        responses = {
-            "friendly": "Oh, how kind of you to say! You've made my day!",
-            "suspicious": "Flattery? What are you after?",
-            "arrogant": "Well, of course. I'm glad you noticed.",
-            "nervous": "Oh! Um, th-thank you... that's very nice...",
-            "wise": "Kind words cost nothing but mean everything."
-        }
-        return responses.get(npc_data['personality'], "Thank you, that's very kind.")
-    
+        return _COMPLIMENT_RESPONSES.get(npc_data['personality'], "Thank you, that's very kind.")
+
     def generate_quest_dialogue(self, npc_data, context):
         """Generate quest-related dialogue"""
         if npc_data['type'] != 'questgiver':
             return f"I'm just a {npc_data['type']}, I don't have any quests for you."
-        
+
         if npc_data['disposition'] < 30:
             return "I wouldn't trust you with my problems."
-        
-        quests = [
-            "There's been strange activity in the old ruins to the north...",
-            "Bandits have been terrorizing travelers on the eastern road.",
-            "I lost a precious family heirloom in the dark forest.",
-            "The town well has been poisoned - we need the antidote from the swamp witch.",
-            "An ancient evil stirs in the abandoned mine shaft."
+
+        return self._rng.choice(_QUESTS) + " Will you help?"
+
+    def generate_dialogue_batch(self, npc_data, actions):
+        """Pre-generate one quest line per action in a single batched draw.
+
+        random.choices performs one RNG setup for all picks, so callers
+        pre-building dialogue pools avoid a round-trip per line.
+        """
+        picks = self._rng.choices(_QUESTS, k=len(actions))
+        return [
+            {"action": action, "dialogue": pick + " Will you help?"}
+            for action, pick in zip(actions, picks)
         ]
-        
-        return random.choice(quests) + " Will you help?"
-    
+
     def generate_trade_dialogue(self, npc_data):
         """Generate trade dialogue"""
         if npc_data['type'] != 'merchant':
             return "I'm not a merchant, but you might try the market square."
-        
+
         if npc_data['disposition'] > 60:
             return "For you, my friend, special prices! Take a look at my wares."
         else:
             return "Certainly, have a look at what I'm selling. Standard prices, of course."
-    
+
     def generate_contextual_dialogue(self, npc_data, player_action, context):
         """Generate dialogue based on specific context"""
         time_of_day = context.get('time_of_day', 12)
         weather = context.get('weather', 'clear')
         location = context.get('location', 'town')
-        
+
         # Time-based responses
         if time_of_day < 6 or time_of_day > 22:
             if npc_data['type'] == 'guard':
                 return "It's late. You should find shelter for the night."
             else:
                 return "What are you doing out at this hour?"
-        
+
         # Weather-based responses
         if weather == 'rain':
-            return random.choice([
-                "Terrible weather we're having.",
-                "This rain is good for the crops, at least.",
-                "I hope this rain ends soon."
-            ])
-        
+            return self._rng.choice(_RAIN_RESPONSES)
+
         # Location-based responses
         if location == 'dungeon':
             return "What are we doing in this forsaken place?!"
-        
+
         # Default contextual response
         if npc_data['secrets']:
             if npc_data['disposition'] > 70:
                 return f"Can I trust you with something? {npc_data['secrets']}"
-        
+
         return "Is there something else you need?"
-    
+
     def generate_response_options(self, npc_data, context):
         """Generate dialogue options for the player"""
-        options = ["Goodbye", "Tell me about yourself", "Do you have any work for me?"]
-        
+        options = list(_BASE_OPTIONS)
+
         if npc_data['type'] == 'merchant':
             options.append("I'd like to trade")
-        
+
         if npc_data['type'] == 'guard':
             options.append("What's the news?")
             options.append("I want to report a crime")
-        
+
         if npc_data['type'] == 'innkeeper':
             options.append("I need a room")
             options.append("Any rumors?")
-        
+
         if npc_data['disposition'] > 60:
             options.append("Can you teach me anything?")
-        
+
         if npc_data['secrets'] and npc_data['disposition'] > 70:
             options.append("Tell me your secret")
-        
+
         return options
-    
+
     def generate_quest_offer(self, npc_data, context):
         """Generate a procedural quest offer"""
-        quest_types = [
-            {"type": "fetch", "target": "ancient_artifact", "location": "ruins", "reward": 500},
-            {"type": "kill", "target": "bandit_leader", "location": "camp", "reward": 750},
-            {"type": "escort", "target": "merchant", "location": "next_town", "reward": 300},
-            {"type": "investigate", "target": "disappearances", "location": "village", "reward": 400},
-            {"type": "deliver", "target": "message", "location": "castle", "reward": 200}
-        ]
-        
-        quest = random.choice(quest_types)
+        quest = dict(self._rng.choice(_QUEST_TYPES))
         quest['giver'] = npc_data['name']
         quest['id'] = f"quest_{npc_data['name']}_{context.get('day_count', 1)}"
-        
+
         return quest
-    
+
     def determine_emotion(self, personality, disposition, player_action):
         """Determine NPC's emotional state"""
-        if player_action == "threaten":
-            return "afraid" if personality == "nervous" else "angry"
-        elif player_action == "compliment":
-            return "happy" if personality == "friendly" else "suspicious" if personality == "suspicious" else "pleased"
-        elif disposition > 70:
+        emotion = (_EMOTION_TABLE.get((player_action, personality))
+                   or _EMOTION_TABLE.get((player_action, None)))
+        if emotion is not None:
+            return emotion
+        if disposition > 70:
             return "friendly"
-        elif disposition < 30:
+        if disposition < 30:
             return "hostile"
-        else:
-            return "neutral"
-    
-    def update_npc_memory(self, npc_name, player_action, dialogue_response):
-        """Update NPC's memory of interactions"""
-        memory_data = self.storage_manager.read_json()
-        npcs = memory_data.get('npcs', {})
-        
-        if npc_name in npcs:
-            npc_data = npcs[npc_name]
-            
-            # Safely get dialogue string
-            dialogue_text = dialogue_response.get('dialogue', '')
-            if dialogue_text:
-                dialogue_text = dialogue_text[:100]  # Store first 100 chars
-            
-            memory_entry = {
-                "action": player_action,
-                "response": dialogue_text,
-                "emotion": dialogue_response.get('emotion', 'neutral'),
-                "timestamp": str(datetime.now())
-            }
-            
-            memories = npc_data.get('memories', [])
-            memories.append(memory_entry)
-            
-            # Keep only last 10 memories
-            npc_data['memories'] = memories[-10:]
-            
-            npcs[npc_name] = npc_data
-            memory_data['npcs'] = npcs
-            self.storage_manager.write_json(memory_data)
-    
+        return "neutral"
+
+    def update_npc_memory(self, npc_name, player_action, dialogue_response, npc_data,
+                          new=False):
+        """Record the interaction and write the NPC's shard back"""
+        # New NPCs always persist; otherwise let the policy filter drop
+        # low-value turns before they cost an upload
+        if not new and self._memory_filter(player_action, dialogue_response):
+            return
+
+        self._record_memory(player_action, dialogue_response, npc_data)
+        self.storage_manager.write_npc(npc_name, npc_data, new=new)
+
+    def _record_memory(self, player_action, dialogue_response, npc_data):
+        """Append the interaction to the NPC's memories without writing"""
+        # Safely get dialogue string
+        dialogue_text = dialogue_response.get('dialogue', '')
+        if dialogue_text:
+            dialogue_text = dialogue_text[:100]  # Store first 100 chars
+
+        memory_entry = {
+            "action": player_action,
+            "response": dialogue_text,
+            "emotion": dialogue_response.get('emotion', 'neutral'),
+            "timestamp": time.time_ns()
+        }
+
+        memories = npc_data.setdefault('memories', [])
+        memories.append(memory_entry)
+
+        # Keep only last 10 memories; in-place trim drops at most one
+        # entry per turn instead of reallocating the list
+        if len(memories) > 10:
+            del memories[:-10]
+
     def generate_npc_name(self):
         """Generate a random NPC name"""
-        first_names = ["Aldric", "Bella", "Cedric", "Diana", "Edmund", "Fiona", "Gareth", "Helena", "Ivan", "Julia"]
-        last_names = ["Blackwood", "Riverstone", "Goldleaf", "Ironforge", "Windwalker", "Moonshire", "Starweaver"]
-        return f"{random.choice(first_names)} {random.choice(last_names)}"
-    
+        return f"{self._rng.choice(_FIRST_NAMES)} {self._rng.choice(_LAST_NAMES)}"
+
+    def generate_npc_names(self, n):
+        """Generate n random NPC names in one batch draw"""
+        firsts = self._rng.choices(_FIRST_NAMES, k=n)
+        lasts = self._rng.choices(_LAST_NAMES, k=n)
+        return [f"{first} {last}" for first, last in zip(firsts, lasts)]
+
     def generate_backstory(self, npc_type):
         """Generate a backstory for the NPC"""
-        backstories = {
-            "merchant": [
-                "a third-generation trader from a long line of merchants",
-                "a former adventurer who settled down to sell exotic goods",
-                "a refugee who rebuilt their life through honest trade"
-            ],
-            "guard": [
-                "a veteran of the kingdom's army, now keeping the peace",
-                "a young recruit eager to prove themselves",
-                "a reformed criminal who now upholds the law"
-            ],
-            "questgiver": [
-                "a retired hero with unfinished business",
-                "a scholar researching ancient mysteries",
-                "a noble seeking help for their troubled lands"
-            ],
-            "innkeeper": [
-                "a former bard who settled down to run this establishment",
-                "the inheritor of a family business spanning generations",
-                "a worldly traveler who decided to create a home for others"
-            ],
-            "wizard": [
-                "a student of the arcane arts for over a century",
-                "an exile from the mage's college seeking redemption",
-                "a self-taught prodigy with unconventional methods"
-            ]
-        }
-        
-        type_stories = backstories.get(npc_type, ["a simple villager living their life"])
-        return random.choice(type_stories)
-    
+        return self._rng.choice(_BACKSTORIES.get(npc_type, _DEFAULT_BACKSTORIES))
+
     def generate_npc_inventory(self, npc_type):
         """Generate items the NPC might have"""
-        inventories = {
-            "merchant": ["health_potion", "rope", "torch", "map", "rare_gem"],
-            "guard": ["sword", "shield", "arrest_warrant", "keys"],
-            "innkeeper": ["ale", "bread", "room_key", "gossip_journal"],
-            "wizard": ["spell_scroll", "magic_crystal", "ancient_tome", "potion_ingredients"]
-        }
-        
-        return inventories.get(npc_type, ["coin_purse"])
-    
+        return list(_INVENTORIES.get(npc_type, _DEFAULT_INVENTORY))
+
     def generate_secrets(self, npc_type):
         """Generate a secret the NPC might have"""
-        secrets = [
-            "I saw strange lights in the forest last night",
-            "The mayor isn't who they claim to be",
-            "There's a hidden treasure in the old well",
-            "I know where the bandits hide their loot",
-            "The blacksmith is secretly a wizard",
-            "Something evil lurks in the castle basement",
-            "I witnessed a murder but I'm too scared to report it"
-        ]
-        
-        return random.choice(secrets)
\ No newline at end of file
+        return self._rng.choice(_SECRETS)
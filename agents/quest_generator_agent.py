@@ -1,11 +1,267 @@
+import asyncio
+import itertools
 import json
 import random
 import logging
+import time
+from collections import deque
 from datetime import datetime
+from enum import IntEnum
+from functools import lru_cache
+from types import MappingProxyType
 from agents.basic_agent import BasicAgent
-from utils.azure_file_storage import AzureFileStorageManager
+from utils.azure_file_storage import get_shared_manager
+
+# %-style args so the record is only formatted when the level is live
+logger = logging.getLogger(__name__)
+
+# orjson encodes the response payload several times faster than the
+# stdlib encoder; fall back when it isn't installed
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, separators=(',', ':'))
+
+# Quest templates, frozen once at import; methods copy the pieces they
+# hand out so the shared tables are never mutated
+_QUEST_TEMPLATES = MappingProxyType({
+    "fetch": MappingProxyType({
+        "objectives": ("retrieve", "collect", "gather", "find"),
+        "targets": ("artifact", "herbs", "ore", "scroll", "gem"),
+        "locations": ("ancient_ruins", "dark_forest", "abandoned_mine", "mystic_cave")
+    }),
+    "kill": MappingProxyType({
+        "objectives": ("defeat", "eliminate", "destroy", "vanquish"),
+        "targets": ("bandit_leader", "monster", "corrupt_official", "dark_wizard"),
+        "locations": ("enemy_camp", "dungeon", "fortress", "lair")
+    }),
+    "escort": MappingProxyType({
+        "objectives": ("protect", "guide", "accompany", "deliver"),
+        "targets": ("merchant", "noble", "scholar", "refugee"),
+        "locations": ("neighboring_town", "capital", "border", "safe_house")
+    }),
+    "investigate": MappingProxyType({
+        "objectives": ("uncover", "discover", "solve", "explore"),
+        "targets": ("mystery", "disappearances", "conspiracy", "phenomena"),
+        "locations": ("crime_scene", "library", "tavern", "underground")
+    })
+})
+_QUEST_TYPE_NAMES = tuple(_QUEST_TEMPLATES)
+
+# Quest ids: wall-clock nanoseconds plus a process-local counter —
+# unique and ordered without building a datetime per quest
+_id_counter = itertools.count()
+
+def _new_id(prefix):
+    return f"{prefix}_{time.time_ns():x}_{next(_id_counter):x}"
+
+# Stored quests keep objectives in columnar (struct-of-arrays) form so
+# the repeated "description"/"type"/"progress" key strings appear once
+# per quest instead of once per objective in the persisted blob
+def _to_soa(objectives):
+    """Pack a list of objective dicts into columnar form for storage"""
+    return {
+        "descriptions": [obj.get('description') for obj in objectives],
+        "types": [obj.get('type') for obj in objectives],
+        "progress": [obj.get('progress', 0) for obj in objectives]
+    }
+
+def _from_soa(soa):
+    """Rebuild the list-of-dicts objectives callers expect"""
+    return [
+        {"description": description, "type": obj_type, "progress": progress}
+        for description, obj_type, progress in zip(
+            soa.get('descriptions', ()), soa.get('types', ()), soa.get('progress', ())
+        )
+    ]
+
+# Display forms of every template word, folded once at import so title
+# building is dict lookups instead of per-call replace/title churn
+_TEMPLATE_WORDS = {
+    word
+    for spec in _QUEST_TEMPLATES.values()
+    for axis in ('objectives', 'targets', 'locations')
+    for word in spec[axis]
+}
+_PRETTY = {word: word.replace('_', ' ').title() for word in _TEMPLATE_WORDS}
+_SPACED = {word: word.replace('_', ' ') for word in _TEMPLATE_WORDS}
+
+# The template space is small (4 types x ~4 objectives x ~5 targets x
+# 4 locations), so the formatted strings for any combination are built
+# once and reused on every later draw of that combination
+@lru_cache(maxsize=512)
+def _format_random_quest(objective, target, location):
+    """Return (title options, narrative, objective description) for a combo"""
+    pretty_target = _PRETTY[target]
+    pretty_location = _PRETTY[location]
+    titles = (
+        f"The {pretty_target} of {pretty_location}",
+        f"{_PRETTY[objective]} the {pretty_target}",
+        f"Trouble at {pretty_location}"
+    )
+    narrative = f"You must {objective} the {target} at {location}"
+    description = f"{_PRETTY[objective]} the {_SPACED[target]}"
+    return titles, narrative, description
+
+_MAIN_QUEST_ARC = (
+    {
+        "title": "The Awakening",
+        "narrative": "Ancient forces stir. A prophecy speaks of a chosen hero...",
+        "objectives": (
+            {"description": "Speak with the Elder Sage", "type": "dialogue"},
+            {"description": "Retrieve the Prophecy Scroll", "type": "fetch"},
+            {"description": "Activate the Ancient Beacon", "type": "interact"}
+        )
+    },
+    {
+        "title": "Gathering Allies",
+        "narrative": "The darkness grows. You must unite the fractured kingdoms...",
+        "objectives": (
+            {"description": "Gain favor with three factions", "type": "reputation"},
+            {"description": "Recruit a legendary warrior", "type": "recruit"},
+            {"description": "Forge an alliance treaty", "type": "diplomacy"}
+        )
+    },
+    {
+        "title": "The First Trial",
+        "narrative": "To prove your worth, you must face the Trial of Elements...",
+        "objectives": (
+            {"description": "Defeat the Fire Guardian", "type": "boss"},
+            {"description": "Solve the Water Temple puzzle", "type": "puzzle"},
+            {"description": "Survive the Earth Labyrinth", "type": "survival"}
+        )
+    },
+    {
+        "title": "The Shadow Rises",
+        "narrative": "The enemy reveals itself. War comes to the realm...",
+        "objectives": (
+            {"description": "Defend the capital from invasion", "type": "defense"},
+            {"description": "Infiltrate the enemy stronghold", "type": "stealth"},
+            {"description": "Discover the enemy's true identity", "type": "investigate"}
+        )
+    },
+    {
+        "title": "The Final Battle",
+        "narrative": "All paths lead here. The fate of the world hangs in balance...",
+        "objectives": (
+            {"description": "Gather the legendary artifacts", "type": "collect"},
+            {"description": "Rally your allies for battle", "type": "preparation"},
+            {"description": "Defeat the Ancient Evil", "type": "final_boss"}
+        )
+    }
+)
+
+class Difficulty(IntEnum):
+    """Quest difficulty; the value doubles as an index into the reward tables"""
+    EASY = 0
+    MEDIUM = 1
+    HARD = 2
+
+# Bound on active_quests kept in the memory blob; older entries are
+# archived so the per-request read/write payload stays fixed-size
+_ACTIVE_QUEST_CAP = 256
+
+# Tables indexed by Difficulty — no per-call dict builds or hash lookups
+_DIFFICULTY_LABELS = ('easy', 'medium', 'hard')
+_REWARD_MULT = (1.0, 1.5, 2.0)
+_OBJ_COUNT = (1, 2, 3)
+
+# Objective prototypes: the counted types carry a format string and a
+# count range so generate_objectives can draw every count in one batch
+_OBJ_PROTO = MappingProxyType({
+    "fetch": {"description_fmt": "Collect {} rare items", "type": "collect", "counts": range(3, 11)},
+    "kill": {"description_fmt": "Defeat {} enemies", "type": "combat", "counts": range(5, 16)},
+    "investigate": {"description": "Find clues about the mystery", "type": "explore"},
+    "escort": {"description": "Safely escort the target", "type": "protect"}
+})
+
+_SIDE_QUESTS = MappingProxyType({
+    "npc_interaction": (
+        {
+            "title": "A Friend in Need",
+            "narrative": "An old friend needs help with a personal matter",
+            "objective_type": "fetch",
+            "difficulty": Difficulty.EASY
+        },
+        {
+            "title": "Family Secrets",
+            "narrative": "Uncover the truth behind a family's dark past",
+            "objective_type": "investigate",
+            "difficulty": Difficulty.MEDIUM
+        }
+    ),
+    "world_event": (
+        {
+            "title": "Crisis Response",
+            "narrative": "The recent events have created chaos that needs addressing",
+            "objective_type": "kill",
+            "difficulty": Difficulty.HARD
+        },
+        {
+            "title": "Opportunity Knocks",
+            "narrative": "The chaos has revealed hidden opportunities",
+            "objective_type": "fetch",
+            "difficulty": Difficulty.MEDIUM
+        }
+    ),
+    "player_action": (
+        {
+            "title": "Consequences",
+            "narrative": "Your recent actions have attracted attention",
+            "objective_type": "escort",
+            "difficulty": Difficulty.MEDIUM
+        },
+        {
+            "title": "Reputation Matters",
+            "narrative": "Someone has heard of your deeds and needs help",
+            "objective_type": "investigate",
+            "difficulty": Difficulty.EASY
+        }
+    )
+})
+
+_CHAIN_TEMPLATES = (
+    {
+        "title_format": "Aftermath of {title}",
+        "narrative": "Your previous actions have had unexpected consequences",
+        "objectives": (
+            {"description": "Deal with the unintended results", "type": "investigate"},
+            {"description": "Fix what was broken", "type": "repair"}
+        )
+    },
+    {
+        "title_format": "The Truth Behind {title}",
+        "narrative": "New information has come to light about your previous quest",
+        "objectives": (
+            {"description": "Uncover the hidden truth", "type": "investigate"},
+            {"description": "Confront the real culprit", "type": "confrontation"}
+        )
+    }
+)
+
+_THREAT_OBJECTIVES = (
+    {"description": "Investigate the threat", "type": "investigate"},
+    {"description": "Neutralize the danger", "type": "combat"}
+)
+
+_FACTION_OBJECTIVES = (
+    {"description": "Negotiate a truce", "type": "diplomacy"},
+    {"description": "Or eliminate their leader", "type": "assassination"}
+)
+
+_CRIME_OBJECTIVES = (
+    {"description": "Evade capture", "type": "escape"},
+    {"description": "Clear your name", "type": "investigate"}
+)
 
 class QuestGeneratorAgent(BasicAgent):
+    # Quest templates
+    quest_templates = _QUEST_TEMPLATES
+
     def __init__(self):
         self.name = 'QuestGenerator'
         self.metadata = {
@@ -35,61 +291,59 @@ class QuestGeneratorAgent(BasicAgent):
                 "required": ["quest_type"]
             }
         }
-        self.storage_manager = AzureFileStorageManager()
-        super().__init__(name=self.name, metadata=self.metadata)
-        
-        # Quest templates
-        self.quest_templates = {
-            "fetch": {
-                "objectives": ["retrieve", "collect", "gather", "find"],
-                "targets": ["artifact", "herbs", "ore", "scroll", "gem"],
-                "locations": ["ancient_ruins", "dark_forest", "abandoned_mine", "mystic_cave"]
-            },
-            "kill": {
-                "objectives": ["defeat", "eliminate", "destroy", "vanquish"],
-                "targets": ["bandit_leader", "monster", "corrupt_official", "dark_wizard"],
-                "locations": ["enemy_camp", "dungeon", "fortress", "lair"]
-            },
-            "escort": {
-                "objectives": ["protect", "guide", "accompany", "deliver"],
-                "targets": ["merchant", "noble", "scholar", "refugee"],
-                "locations": ["neighboring_town", "capital", "border", "safe_house"]
-            },
-            "investigate": {
-                "objectives": ["uncover", "discover", "solve", "explore"],
-                "targets": ["mystery", "disappearances", "conspiracy", "phenomena"],
-                "locations": ["crime_scene", "library", "tavern", "underground"]
-            }
+        self.storage_manager = get_shared_manager()
+        # Per-user memory cache with dirty tracking: perform() reads the
+        # blob at most once per user and writes once at the end, instead
+        # of separate reads in get_quest_history and save_quest
+        self._memory_cache = {}
+        self._dirty = set()
+        self._etags = {}
+        # Quest history lives in an append-only jsonl log, read once
+        # per user and appended to in O(1) instead of rewritten
+        self._history_cache = {}
+        # Quest-type dispatch: one lookup instead of an if/elif chain,
+        # and subclasses can register new types by adding entries
+        self._dispatch = {
+            "main": self.generate_main_quest,
+            "side": self.generate_side_quest,
+            "chain": self.generate_chain_quest,
+            "emergent": self.generate_emergent_quest
         }
-    
+        super().__init__(name=self.name, metadata=self.metadata)
+
     def perform(self, **kwargs):
         quest_type = kwargs.get('quest_type', 'random')
         context = kwargs.get('context', {})
         trigger = kwargs.get('trigger', 'random')
         user_guid = kwargs.get('user_guid')
         
-        if user_guid:
-            self.storage_manager.set_memory_context(user_guid)
-        
-        # Get player quest history
+        # Always set the context: the manager is shared process-wide, so
+        # a guid-less call must reset to shared memory rather than
+        # inherit whatever guid the previous caller left behind
+        self.storage_manager.set_memory_context(user_guid)
+
+        # Other agents write the same blob between requests, so a warm
+        # snapshot would revert their changes on write-back; drop any
+        # cached copy and re-read fresh (the cache still collapses the
+        # multiple reads within this request into one)
+        key = self.storage_manager.current_guid or ''
+        self._memory_cache.pop(key, None)
+        self._etags.pop(key, None)
+
+        # Get player quest history (one read, shared with save_quest)
         quest_history = self.get_quest_history()
         
         # Generate quest based on type
-        if quest_type == "main":
-            quest = self.generate_main_quest(context, quest_history)
-        elif quest_type == "side":
-            quest = self.generate_side_quest(context, trigger)
-        elif quest_type == "chain":
-            quest = self.generate_chain_quest(quest_history)
-        elif quest_type == "emergent":
-            quest = self.generate_emergent_quest(context, trigger)
-        else:
-            quest = self.generate_random_quest(context)
+        handler = self._dispatch.get(quest_type, self.generate_random_quest)
+        quest = handler(context, trigger, quest_history)
         
-        # Save quest to memory
+        # Save quest to memory and flush the single dirty write
         self.save_quest(quest)
-        
-        return json.dumps({
+        self.flush()
+
+        logger.debug("quest %s generated for %s", quest.get('id'), user_guid)
+
+        return _dumps({
             "status": "success",
             "quest": quest,
             "narrative": quest['narrative'],
@@ -97,67 +351,62 @@ class QuestGeneratorAgent(BasicAgent):
             "rewards": quest['rewards']
         })
     
-    def generate_main_quest(self, context, quest_history):
+    async def perform_async(self, **kwargs):
+        """Run perform in a worker thread so callers can await it.
+
+        The Azure round-trips dominate quest generation, so a server
+        handling a burst of requests can gather several of these
+        instead of paying each round-trip serially.
+        """
+        return await asyncio.to_thread(self.perform, **kwargs)
+
+    async def perform_many_async(self, requests, limit=16):
+        """Generate quests for many requests concurrently.
+
+        requests is a list of kwargs dicts for perform; limit caps the
+        number of in-flight Azure operations. Requests are grouped by
+        user_guid and the groups run one after another: the memory
+        context is per-manager state on the shared storage manager, so
+        only same-user requests are safe to have in flight together.
+        Results come back in the order of the original list.
+        """
+        semaphore = asyncio.Semaphore(limit)
+
+        async def run_one(kwargs):
+            async with semaphore:
+                return await asyncio.to_thread(self.perform, **kwargs)
+
+        groups = {}
+        for index, kwargs in enumerate(requests):
+            groups.setdefault(kwargs.get('user_guid'), []).append((index, kwargs))
+
+        results = [None] * len(requests)
+        for group in groups.values():
+            outcomes = await asyncio.gather(*(run_one(kwargs) for _, kwargs in group))
+            for (index, _), outcome in zip(group, outcomes):
+                results[index] = outcome
+        return results
+
+    def generate_main_quest(self, context, trigger=None, quest_history=None):
         """Generate a main story quest"""
-        chapter = len([q for q in quest_history if q.get('type') == 'main']) + 1
-        
-        main_quest_arc = [
-            {
-                "title": "The Awakening",
-                "narrative": "Ancient forces stir. A prophecy speaks of a chosen hero...",
-                "objectives": [
-                    {"description": "Speak with the Elder Sage", "type": "dialogue"},
-                    {"description": "Retrieve the Prophecy Scroll", "type": "fetch"},
-                    {"description": "Activate the Ancient Beacon", "type": "interact"}
-                ]
-            },
-            {
-                "title": "Gathering Allies",
-                "narrative": "The darkness grows. You must unite the fractured kingdoms...",
-                "objectives": [
-                    {"description": "Gain favor with three factions", "type": "reputation"},
-                    {"description": "Recruit a legendary warrior", "type": "recruit"},
-                    {"description": "Forge an alliance treaty", "type": "diplomacy"}
-                ]
-            },
-            {
-                "title": "The First Trial",
-                "narrative": "To prove your worth, you must face the Trial of Elements...",
-                "objectives": [
-                    {"description": "Defeat the Fire Guardian", "type": "boss"},
-                    {"description": "Solve the Water Temple puzzle", "type": "puzzle"},
-                    {"description": "Survive the Earth Labyrinth", "type": "survival"}
-                ]
-            },
-            {
-                "title": "The Shadow Rises",
-                "narrative": "The enemy reveals itself. War comes to the realm...",
-                "objectives": [
-                    {"description": "Defend the capital from invasion", "type": "defense"},
-                    {"description": "Infiltrate the enemy stronghold", "type": "stealth"},
-                    {"description": "Discover the enemy's true identity", "type": "investigate"}
-                ]
-            },
-            {
-                "title": "The Final Battle",
-                "narrative": "All paths lead here. The fate of the world hangs in balance...",
-                "objectives": [
-                    {"description": "Gather the legendary artifacts", "type": "collect"},
-                    {"description": "Rally your allies for battle", "type": "preparation"},
-                    {"description": "Defeat the Ancient Evil", "type": "final_boss"}
-                ]
-            }
-        ]
-        
-        quest_data = main_quest_arc[min(chapter - 1, len(main_quest_arc) - 1)]
-        
+        quest_history = quest_history if quest_history is not None else self.get_quest_history()
+        # Prefer the denormalized counter; fall back to a streaming scan
+        # for memories written before counts existed
+        counts = self._get_memory().get('counts')
+        if counts is not None:
+            chapter = counts.get('main', 0) + 1
+        else:
+            chapter = sum(1 for q in quest_history if q.get('type') == 'main') + 1
+
+        quest_data = _MAIN_QUEST_ARC[min(chapter - 1, len(_MAIN_QUEST_ARC) - 1)]
+
         return {
             "id": f"main_quest_chapter_{chapter}",
             "type": "main",
             "chapter": chapter,
             "title": quest_data['title'],
             "narrative": quest_data['narrative'],
-            "objectives": quest_data['objectives'],
+            "objectives": [dict(obj) for obj in quest_data['objectives']],
             "rewards": {
                 "experience": 1000 * chapter,
                 "gold": 500 * chapter,
@@ -172,58 +421,13 @@ class QuestGeneratorAgent(BasicAgent):
             }
         }
     
-    def generate_side_quest(self, context, trigger):
+    def generate_side_quest(self, context, trigger, quest_history=None):
         """Generate a side quest based on trigger"""
         player_level = context.get('player_level', 1)
         location = context.get('location', 'town')
         faction = context.get('dominant_faction', 'neutral')
         
-        side_quests = {
-            "npc_interaction": [
-                {
-                    "title": "A Friend in Need",
-                    "narrative": "An old friend needs help with a personal matter",
-                    "objective_type": "fetch",
-                    "difficulty": "easy"
-                },
-                {
-                    "title": "Family Secrets",
-                    "narrative": "Uncover the truth behind a family's dark past",
-                    "objective_type": "investigate",
-                    "difficulty": "medium"
-                }
-            ],
-            "world_event": [
-                {
-                    "title": "Crisis Response",
-                    "narrative": "The recent events have created chaos that needs addressing",
-                    "objective_type": "kill",
-                    "difficulty": "hard"
-                },
-                {
-                    "title": "Opportunity Knocks",
-                    "narrative": "The chaos has revealed hidden opportunities",
-                    "objective_type": "fetch",
-                    "difficulty": "medium"
-                }
-            ],
-            "player_action": [
-                {
-                    "title": "Consequences",
-                    "narrative": "Your recent actions have attracted attention",
-                    "objective_type": "escort",
-                    "difficulty": "medium"
-                },
-                {
-                    "title": "Reputation Matters",
-                    "narrative": "Someone has heard of your deeds and needs help",
-                    "objective_type": "investigate",
-                    "difficulty": "easy"
-                }
-            ]
-        }
-        
-        quest_pool = side_quests.get(trigger, side_quests['player_action'])
+        quest_pool = _SIDE_QUESTS.get(trigger, _SIDE_QUESTS['player_action'])
         quest_template = random.choice(quest_pool)
         
         # Generate specific objectives based on template
@@ -231,7 +435,7 @@ class QuestGeneratorAgent(BasicAgent):
         objectives = self.generate_objectives(objective_type, quest_template['difficulty'])
         
         return {
-            "id": f"side_{trigger}_{datetime.now().timestamp()}",
+            "id": _new_id(f"side_{trigger}"),
             "type": "side",
             "title": quest_template['title'],
             "narrative": quest_template['narrative'],
@@ -242,44 +446,31 @@ class QuestGeneratorAgent(BasicAgent):
             "faction_impact": {faction: random.randint(-10, 10)}
         }
     
-    def generate_chain_quest(self, quest_history):
+    def generate_chain_quest(self, context, trigger=None, quest_history=None):
         """Generate a quest that continues from a previous quest"""
-        # Find completed quests that can have follow-ups
-        completed_quests = [q for q in quest_history if q.get('status') == 'completed']
-        
-        if not completed_quests:
-            return self.generate_random_quest({})
-        
-        parent_quest = random.choice(completed_quests[-5:])  # Recent quests only
-        
-        chain_templates = [
-            {
-                "title": f"Aftermath of {parent_quest.get('title', 'Previous Quest')}",
-                "narrative": "Your previous actions have had unexpected consequences",
-                "objectives": [
-                    {"description": "Deal with the unintended results", "type": "investigate"},
-                    {"description": "Fix what was broken", "type": "repair"}
-                ]
-            },
-            {
-                "title": f"The Truth Behind {parent_quest.get('title', 'Previous Quest')}",
-                "narrative": "New information has come to light about your previous quest",
-                "objectives": [
-                    {"description": "Uncover the hidden truth", "type": "investigate"},
-                    {"description": "Confront the real culprit", "type": "confrontation"}
-                ]
-            }
-        ]
-        
-        template = random.choice(chain_templates)
+        quest_history = quest_history if quest_history is not None else self.get_quest_history()
+        # One bounded pass over history: keep only the last 5 completed
+        # quests instead of materializing every completed quest
+        recent_completed = deque(
+            (q for q in quest_history if q.get('status') == 'completed'),
+            maxlen=5
+        )
+
+        if not recent_completed:
+            return self.generate_random_quest(context or {})
         
+        parent_quest = random.choice(recent_completed)  # Recent quests only
+
+        template = random.choice(_CHAIN_TEMPLATES)
+
         return {
-            "id": f"chain_{parent_quest.get('id', 'unknown')}_{datetime.now().timestamp()}",
+            "id": _new_id(f"chain_{parent_quest.get('id', 'unknown')}"),
             "type": "chain",
             "parent_quest": parent_quest.get('id'),
-            "title": template['title'],
+            "title": template['title_format'].format(
+                title=parent_quest.get('title', 'Previous Quest')),
             "narrative": template['narrative'],
-            "objectives": template['objectives'],
+            "objectives": [dict(obj) for obj in template['objectives']],
             "rewards": {
                 "experience": parent_quest.get('rewards', {}).get('experience', 100) * 1.5,
                 "gold": parent_quest.get('rewards', {}).get('gold', 50) * 1.2,
@@ -288,55 +479,63 @@ class QuestGeneratorAgent(BasicAgent):
             }
         }
     
-    def generate_emergent_quest(self, context, trigger):
+    def generate_emergent_quest(self, context, trigger, quest_history=None):
         """Generate quest based on emergent gameplay situations"""
         world_state = context.get('world_state', {})
         player_actions = context.get('recent_actions', [])
-        
-        emergent_scenarios = []
-        
-        # Check world threats
+
+        # Reservoir-sample (Algorithm R) over the eligible triggers so
+        # only the winning scenario dict is ever built; each eligible
+        # branch replaces the choice with probability 1/n
+        chosen = None
+        n = 0
+
         if world_state.get('world_threats'):
-            emergent_scenarios.append({
+            n += 1
+            chosen = 'threat'
+
+        faction_standings = world_state.get('faction_standings', {})
+        hostile_faction = next(
+            (faction for faction, standing in faction_standings.items() if standing < 20),
+            None
+        )
+        if hostile_faction is not None:
+            n += 1
+            if random.randrange(n) == 0:
+                chosen = 'faction'
+
+        if "steal" in player_actions:
+            n += 1
+            if random.randrange(n) == 0:
+                chosen = 'crime'
+
+        if chosen == 'threat':
+            scenario = {
                 "title": "Clear and Present Danger",
                 "narrative": f"The {world_state['world_threats'][0]} threatens everyone",
-                "objectives": [
-                    {"description": "Investigate the threat", "type": "investigate"},
-                    {"description": "Neutralize the danger", "type": "combat"}
-                ],
+                "objectives": [dict(obj) for obj in _THREAT_OBJECTIVES],
                 "urgency": "high"
-            })
-        
-        # Check faction conflicts
-        faction_standings = world_state.get('faction_standings', {})
-        hostile_factions = [f for f, standing in faction_standings.items() if standing < 20]
-        if hostile_factions:
-            emergent_scenarios.append({
+            }
+        elif chosen == 'faction':
+            scenario = {
                 "title": "Diplomatic Solution",
-                "narrative": f"Your conflict with {hostile_factions[0]} escalates",
-                "objectives": [
-                    {"description": "Negotiate a truce", "type": "diplomacy"},
-                    {"description": "Or eliminate their leader", "type": "assassination"}
-                ],
+                "narrative": f"Your conflict with {hostile_faction} escalates",
+                "objectives": [dict(obj) for obj in _FACTION_OBJECTIVES],
                 "urgency": "medium"
-            })
-        
-        # Player crime/heroics
-        if "steal" in player_actions:
-            emergent_scenarios.append({
+            }
+        elif chosen == 'crime':
+            scenario = {
                 "title": "The Long Arm of the Law",
                 "narrative": "Your crimes have caught up with you",
-                "objectives": [
-                    {"description": "Evade capture", "type": "escape"},
-                    {"description": "Clear your name", "type": "investigate"}
-                ],
+                "objectives": [dict(obj) for obj in _CRIME_OBJECTIVES],
                 "urgency": "high"
-            })
-        
-        if emergent_scenarios:
-            scenario = random.choice(emergent_scenarios)
+            }
+        else:
+            scenario = None
+
+        if scenario is not None:
             return {
-                "id": f"emergent_{trigger}_{datetime.now().timestamp()}",
+                "id": _new_id(f"emergent_{trigger}"),
                 "type": "emergent",
                 "title": scenario['title'],
                 "narrative": scenario['narrative'],
@@ -352,29 +551,25 @@ class QuestGeneratorAgent(BasicAgent):
         
         return self.generate_random_quest(context)
     
-    def generate_random_quest(self, context):
+    def generate_random_quest(self, context, trigger=None, quest_history=None):
         """Generate a completely random quest"""
-        quest_type = random.choice(list(self.quest_templates.keys()))
-        template = self.quest_templates[quest_type]
+        quest_type = random.choice(_QUEST_TYPE_NAMES)
+        template = _QUEST_TEMPLATES[quest_type]
         
         objective = random.choice(template['objectives'])
         target = random.choice(template['targets'])
         location = random.choice(template['locations'])
-        
-        title_formats = [
-            f"The {target.replace('_', ' ').title()} of {location.replace('_', ' ').title()}",
-            f"{objective.title()} the {target.replace('_', ' ').title()}",
-            f"Trouble at {location.replace('_', ' ').title()}"
-        ]
-        
+
+        titles, narrative, description = _format_random_quest(objective, target, location)
+
         return {
-            "id": f"random_{datetime.now().timestamp()}",
+            "id": _new_id("random"),
             "type": "random",
-            "title": random.choice(title_formats),
-            "narrative": f"You must {objective} the {target} at {location}",
+            "title": random.choice(titles),
+            "narrative": narrative,
             "objectives": [
                 {
-                    "description": f"{objective.title()} the {target.replace('_', ' ')}",
+                    "description": description,
                     "type": quest_type,
                     "target": target,
                     "location": location,
@@ -390,69 +585,221 @@ class QuestGeneratorAgent(BasicAgent):
             "optional": True
         }
     
+    def generate_random_quests(self, n):
+        """Generate n random quests with batched RNG draws.
+
+        Each categorical axis is drawn with one random.choices call per
+        quest type instead of independent per-quest picks, which keeps
+        bulk world seeding cheap.
+        """
+        quest_types = random.choices(_QUEST_TYPE_NAMES, k=n)
+
+        # One batched draw per axis per quest type actually present
+        counts = {}
+        for quest_type in quest_types:
+            counts[quest_type] = counts.get(quest_type, 0) + 1
+        draws = {}
+        for quest_type, count in counts.items():
+            template = _QUEST_TEMPLATES[quest_type]
+            draws[quest_type] = (
+                iter(random.choices(template['objectives'], k=count)),
+                iter(random.choices(template['targets'], k=count)),
+                iter(random.choices(template['locations'], k=count))
+            )
+
+        title_picks = random.choices((0, 1, 2), k=n)
+        difficulties = random.choices(("easy", "medium", "hard"), k=n)
+        experiences = random.choices(range(50, 201), k=n)
+        golds = random.choices(range(20, 101), k=n)
+        item_counts = random.choices(range(1, 6), k=n)
+
+        quests = []
+        for i, quest_type in enumerate(quest_types):
+            objectives_it, targets_it, locations_it = draws[quest_type]
+            objective = next(objectives_it)
+            target = next(targets_it)
+            location = next(locations_it)
+
+            titles, narrative, description = _format_random_quest(objective, target, location)
+
+            quests.append({
+                "id": _new_id("random"),
+                "type": "random",
+                "title": titles[title_picks[i]],
+                "narrative": narrative,
+                "objectives": [
+                    {
+                        "description": description,
+                        "type": quest_type,
+                        "target": target,
+                        "location": location,
+                        "count": item_counts[i] if quest_type == "fetch" else 1
+                    }
+                ],
+                "rewards": {
+                    "experience": experiences[i],
+                    "gold": golds[i],
+                    "items": ["random_loot"]
+                },
+                "difficulty": difficulties[i],
+                "optional": True
+            })
+
+        return quests
+
     def generate_objectives(self, objective_type, difficulty):
         """Generate specific objectives based on type and difficulty"""
-        objective_count = {"easy": 1, "medium": 2, "hard": 3}[difficulty]
-        objectives = []
-        
-        for i in range(objective_count):
-            if objective_type == "fetch":
-                objectives.append({
-                    "description": f"Collect {random.randint(3, 10)} rare items",
-                    "type": "collect",
-                    "progress": 0
-                })
-            elif objective_type == "kill":
-                objectives.append({
-                    "description": f"Defeat {random.randint(5, 15)} enemies",
-                    "type": "combat",
-                    "progress": 0
-                })
-            elif objective_type == "investigate":
-                objectives.append({
-                    "description": "Find clues about the mystery",
-                    "type": "explore",
-                    "progress": 0
-                })
-            elif objective_type == "escort":
-                objectives.append({
-                    "description": "Safely escort the target",
-                    "type": "protect",
-                    "progress": 0
-                })
-        
-        return objectives
+        proto = _OBJ_PROTO.get(objective_type)
+        if proto is None:
+            return []
+
+        n = _OBJ_COUNT[difficulty]
+        counts = proto.get('counts')
+        if counts is not None:
+            # Counted objectives: one batched draw, then fill the format string
+            fmt = proto['description_fmt']
+            obj_type = proto['type']
+            return [
+                {"description": fmt.format(c), "type": obj_type, "progress": 0}
+                for c in random.choices(counts, k=n)
+            ]
+        return [
+            {"description": proto['description'], "type": proto['type'], "progress": 0}
+            for _ in range(n)
+        ]
     
     def calculate_rewards(self, player_level, difficulty):
         """Calculate appropriate rewards based on level and difficulty"""
         base_exp = player_level * 10
         base_gold = player_level * 5
         
-        multipliers = {"easy": 1, "medium": 1.5, "hard": 2}
-        multiplier = multipliers[difficulty]
-        
+        multiplier = _REWARD_MULT[difficulty]
+
         return {
             "experience": int(base_exp * multiplier),
             "gold": int(base_gold * multiplier),
-            "items": [f"{difficulty}_reward_item"],
+            "items": [f"{_DIFFICULTY_LABELS[difficulty]}_reward_item"],
             "reputation": random.randint(1, 10) * multiplier
         }
     
+    def _get_memory(self):
+        """Return the current user's memory dict, reading it at most once"""
+        key = self.storage_manager.current_guid or ''
+        memory_data = self._memory_cache.get(key)
+        if memory_data is None:
+            memory_data, etag = self.storage_manager.read_json_with_etag()
+            if len(self._memory_cache) > 128:
+                self._memory_cache.clear()
+                self._etags.clear()
+            self._memory_cache[key] = memory_data
+            self._etags[key] = etag
+        return memory_data
+
     def get_quest_history(self):
-        """Get player's quest history from memory"""
-        memory_data = self.storage_manager.read_json()
-        return memory_data.get('quest_history', [])
-    
+        """Get player's quest history from the append-only log"""
+        key = self.storage_manager.current_guid or ''
+        history = self._history_cache.get(key)
+        if history is None:
+            history = self.storage_manager.read_jsonl('quest_log.jsonl')
+            if not history:
+                # Histories written before the log existed
+                history = self._get_memory().get('quest_history', [])
+            if len(self._history_cache) > 128:
+                self._history_cache.clear()
+            self._history_cache[key] = history
+        return history
+
+    def get_active_quests(self):
+        """Return active quests with objectives expanded to list-of-dicts"""
+        quests = []
+        for quest in self._get_memory().get('active_quests', []):
+            objectives = quest.get('objectives')
+            if isinstance(objectives, dict):
+                quest = dict(quest)
+                quest['objectives'] = _from_soa(objectives)
+            quests.append(quest)
+        return quests
+
     def save_quest(self, quest):
-        """Save quest to player's active quests"""
-        memory_data = self.storage_manager.read_json()
-        active_quests = memory_data.get('active_quests', [])
-        
+        """Add the quest to active quests and the history log.
+
+        The active list is written on flush; the history append moves
+        only the new quest's bytes, not the whole history.
+        """
+        memory_data = self._get_memory()
+        active_quests = memory_data.setdefault('active_quests', [])
+
         # Add timestamp
-        quest['received_at'] = str(datetime.now())
+        quest['received_at'] = datetime.now().isoformat()
         quest['status'] = 'active'
-        
-        active_quests.append(quest)
-        memory_data['active_quests'] = active_quests
-        
-        self.storage_manager.write_json(memory_data)
\ No newline at end of file
+
+        # Persist objectives columnar; the quest handed back to the
+        # caller keeps the list-of-dicts shape (see _to_soa/_from_soa)
+        stored = quest
+        objectives = quest.get('objectives')
+        if isinstance(objectives, list):
+            stored = dict(quest)
+            stored['objectives'] = _to_soa(objectives)
+        active_quests.append(stored)
+
+        # Keep the memory blob bounded: spill the oldest active quests
+        # to an append-only archive (full history stays in quest_log)
+        if len(active_quests) > _ACTIVE_QUEST_CAP:
+            for old_quest in active_quests[:-_ACTIVE_QUEST_CAP]:
+                self.storage_manager.append_jsonl('quest_archive.jsonl', old_quest)
+            del active_quests[:-_ACTIVE_QUEST_CAP]
+
+        # Denormalized per-type counters keep chapter lookups O(1)
+        # regardless of history size; seed them from history once for
+        # memories that predate the counters
+        counts = memory_data.get('counts')
+        if counts is None:
+            counts = {}
+            for past in self.get_quest_history():
+                past_type = past.get('type', 'unknown')
+                counts[past_type] = counts.get(past_type, 0) + 1
+            memory_data['counts'] = counts
+        quest_type = quest.get('type', 'unknown')
+        counts[quest_type] = counts.get(quest_type, 0) + 1
+
+        self._dirty.add(self.storage_manager.current_guid or '')
+
+        self.storage_manager.append_jsonl('quest_log.jsonl', quest)
+        history = self._history_cache.get(self.storage_manager.current_guid or '')
+        if history is not None:
+            history.append(quest)
+
+    def flush(self):
+        """Write the current user's memory back if it has pending changes.
+
+        Uses optimistic concurrency: if another agent updated the blob
+        since it was read, re-read it, merge our new quests in by id,
+        and retry; after three lost races the write goes through
+        unconditionally so a quest is never dropped.
+        """
+        key = self.storage_manager.current_guid or ''
+        if key not in self._dirty:
+            return
+
+        memory_data = self._memory_cache[key]
+        etag = self._etags.get(key)
+        if etag is None:
+            # Without an etag the conditional write degrades to a blind
+            # overwrite; a properties call recovers the current one
+            # (still None only when the file does not exist yet)
+            etag = self.storage_manager.get_etag()
+        for _ in range(3):
+            if self.storage_manager.write_json_if_match(memory_data, etag):
+                break
+            fresh, etag = self.storage_manager.read_json_with_etag()
+            fresh_quests = fresh.setdefault('active_quests', [])
+            known = {q.get('id') for q in fresh_quests}
+            for quest in memory_data.get('active_quests', []):
+                if quest.get('id') not in known:
+                    fresh_quests.append(quest)
+            memory_data = fresh
+            self._memory_cache[key] = fresh
+        else:
+            self.storage_manager.write_json(memory_data)
+        self._etags.pop(key, None)
+        self._dirty.discard(key)
\ No newline at end of file
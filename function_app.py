@@ -4,19 +4,110 @@ import json
 import os
 import importlib
 import importlib.util
-import inspect
 import sys
 import re
-from agents.basic_agent import BasicAgent
+import random
+import types
 import uuid
-from openai import AzureOpenAI
+import copy
+from collections import deque
 from datetime import datetime
 import time
-from utils.azure_file_storage import AzureFileStorageManager, safe_json_loads
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from agents.basic_agent import BasicAgent
+    from openai import AzureOpenAI
+
+# The OpenAI SDK (pydantic/httpx) and the agent tree dominate cold
+# start, so they are imported on first use rather than at module load.
+# OPENAI_EAGER_IMPORT=1 restores eager imports (e.g. for CI smoke runs).
+if os.environ.get('OPENAI_EAGER_IMPORT') == '1':
+    from agents.basic_agent import BasicAgent
+    from openai import AzureOpenAI
+    from utils.azure_file_storage import AzureFileStorageManager, safe_json_loads
+
+def __getattr__(name):
+    # PEP 562: keep module-level names importable without paying for
+    # them at cold start
+    if name == 'BasicAgent':
+        from agents.basic_agent import BasicAgent
+        return BasicAgent
+    if name == 'AzureOpenAI':
+        from openai import AzureOpenAI
+        return AzureOpenAI
+    if name == 'AzureFileStorageManager':
+        from utils.azure_file_storage import AzureFileStorageManager
+        return AzureFileStorageManager
+    if name == 'safe_json_loads':
+        from utils.azure_file_storage import safe_json_loads
+        return safe_json_loads
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# orjson handles the per-request encode/decode (game data, agent args,
+# response bodies) several times faster than stdlib json; fall back
+# when the wheel isn't available
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+
+    def _dumps_bytes(obj):
+        return orjson.dumps(obj)
+
+    _json_loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, separators=(',', ':'))
+
+    def _dumps_bytes(obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    _json_loads = json.loads
 
 # Default GUID to use when no specific user GUID is provided
 DEFAULT_USER_GUID = "c0p110t0-aaaa-bbbb-cccc-123456789abc"
 
+# Opt-in streaming for OpenAI completions: tokens are consumed as they
+# arrive rather than waiting for the whole completion to be produced.
+# The classic Functions HTTP model buffers the response, so this cannot
+# yet flow through to the client as SSE.
+_STREAM_COMPLETIONS = os.environ.get('OPENAI_STREAM_COMPLETIONS', '').lower() in ('1', 'true', 'yes')
+
+# App settings snapshotted once at module load; the Functions host
+# recycles the worker when settings change, so these can't go stale
+_ASSISTANT_NAME = str(os.environ.get('ASSISTANT_NAME', 'GameMaster'))
+_CHARACTERISTIC_DESCRIPTION = str(os.environ.get('CHARACTERISTIC_DESCRIPTION', 'An immersive AI game master for dynamic storytelling'))
+_OPENAI_API_KEY = os.environ.get('AZURE_OPENAI_API_KEY')
+_OPENAI_ENDPOINT = os.environ.get('AZURE_OPENAI_ENDPOINT')
+_OPENAI_API_VERSION = os.environ.get('AZURE_OPENAI_API_VERSION', '2024-02-01')
+_OPENAI_DEPLOYMENT = os.environ.get('AZURE_OPENAI_DEPLOYMENT_NAME', 'gpt-deployment')
+
+# GUID patterns, compiled once; these run on every request
+_GUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+_LABELED_GUID_RE = re.compile(r'^guid[:=\s]+([0-9a-f-]{36})$', re.IGNORECASE)
+
+# The same prompt and first message get matched in both main() and
+# get_response; caching makes the repeat checks dictionary lookups
+@lru_cache(maxsize=256)
+def _is_bare_guid(text_str):
+    return _GUID_RE.match(text_str) is not None
+
+@lru_cache(maxsize=1024)
+def _extract_guid(text_str):
+    match = _GUID_RE.match(text_str)
+    if match:
+        return match.group(0)
+
+    match = _LABELED_GUID_RE.match(text_str)
+    if match:
+        return match.group(1)
+
+    return None
+
 def ensure_string_content(message):
     """
     Ensures message content is converted to a string regardless of input type.
@@ -24,10 +115,14 @@ def ensure_string_content(message):
     """
     if message is None:
         return {"role": "user", "content": ""}
-        
+
     if not isinstance(message, dict):
         return {"role": "user", "content": str(message) if message is not None else ""}
-    
+
+    # Fast path: a well-formed message needs no copy at all
+    if 'role' in message and isinstance(message.get('content'), str):
+        return message
+
     message = message.copy()
     
     if 'role' not in message:
@@ -56,7 +151,7 @@ def ensure_string_function_args(function_call):
         return None
         
     if isinstance(function_call.arguments, (dict, list)):
-        return json.dumps(function_call.arguments)
+        return _dumps(function_call.arguments)
     
     return str(function_call.arguments)
 
@@ -66,154 +161,221 @@ def build_cors_response(origin):
     Safely handles None origin.
     """
     return {
-        "Access-Control-Allow-Origin": str(origin) if origin else "*",
+        "Access-Control-Allow-Origin": origin if origin else "*",
         "Access-Control-Allow-Methods": "*",
         "Access-Control-Allow-Headers": "*",
         "Access-Control-Allow-Credentials": "true",
         "Access-Control-Max-Age": "86400",
     }
 
-def load_agents_from_folder():
-    agents_directory = os.path.join(os.path.dirname(__file__), "agents")
-    files_in_agents_directory = os.listdir(agents_directory)
-    agent_files = [f for f in files_in_agents_directory if f.endswith(".py") and f not in ["__init__.py", "basic_agent.py"]]
-
-    declared_agents = {}
-    for file in agent_files:
-        try:
-            module_name = file[:-3]
-            module = importlib.import_module(f'agents.{module_name}')
-            for name, obj in inspect.getmembers(module):
-                if inspect.isclass(obj) and issubclass(obj, BasicAgent) and obj is not BasicAgent:
-                    agent_instance = obj()
-                    declared_agents[agent_instance.name] = agent_instance
-        except Exception as e:
-            logging.error(f"Error loading agent {file}: {str(e)}")
-            continue
+def _json_response(payload, cors_headers, status_code=200):
+    """
+    Builds a JSON HttpResponse from a pre-encoded bytes body.
+    Encoding once here lets the host send an exact Content-Length
+    instead of re-encoding the string internally.
+    """
+    body = _dumps_bytes(payload)
+    return func.HttpResponse(
+        body,
+        status_code=status_code,
+        mimetype="application/json",
+        headers={**cors_headers, "Content-Length": str(len(body))}
+    )
+
+# Loaded agents survive across warm invocations; re-listing the local
+# folder and both Azure shares per request costs hundreds of ms for a
+# result that almost never changes. AGENTS_CACHE_TTL (seconds) bounds
+# how stale the cache may get when agents are updated in the share.
+_AGENTS_CACHE = None
+_AGENTS_CACHE_TS = 0.0
+_AGENTS_CACHE_TTL = float(os.environ.get('AGENTS_CACHE_TTL', '300'))
+
+def _load_agents_from_share(storage_manager, share_name, declared_agents, package_name=None):
+    """Load agent classes from one Azure File Share directory.
+
+    Handles both the flat 'agents' share and package-style shares like
+    'multi_agents', which get a synthetic parent package in sys.modules
+    so relative references inside the loaded modules resolve.
+    """
+    from agents.basic_agent import BasicAgent
 
-    storage_manager = AzureFileStorageManager()
     try:
-        agent_files = storage_manager.list_files('agents')
-        
-        for file in agent_files:
+        share_files = storage_manager.list_files(share_name)
+
+        for file in share_files:
             if not file.name.endswith('_agent.py'):
                 continue
 
             try:
-                file_content = storage_manager.read_file('agents', file.name)
+                file_content = storage_manager.read_file(share_name, file.name)
                 if file_content is None:
                     continue
 
-                temp_dir = "/tmp/agents"
-                os.makedirs(temp_dir, exist_ok=True)
-                temp_file = f"{temp_dir}/{file.name}"
-
-                with open(temp_file, 'w') as f:
-                    f.write(file_content)
-
-                if temp_dir not in sys.path:
-                    sys.path.append(temp_dir)
-
+                # Execute the downloaded source directly; round-tripping
+                # it through a temp file only added syscalls
                 module_name = file.name[:-3]
-                spec = importlib.util.spec_from_file_location(module_name, temp_file)
+                qualified_name = f"{package_name}.{module_name}" if package_name else module_name
+                spec = importlib.util.spec_from_loader(qualified_name, loader=None)
                 module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
 
-                for name, obj in inspect.getmembers(module):
-                    if (inspect.isclass(obj) and
-                        issubclass(obj, BasicAgent) and
-                        obj is not BasicAgent):
+                if package_name:
+                    if package_name not in sys.modules:
+                        sys.modules[package_name] = types.ModuleType(package_name)
+                    sys.modules[qualified_name] = module
+
+                exec(compile(file_content, f'<azure:{file.name}>', 'exec'), module.__dict__)
+
+                for name, obj in vars(module).items():
+                    if (isinstance(obj, type) and issubclass(obj, BasicAgent) and
+                            obj is not BasicAgent and obj.__module__ == module.__name__):
                         agent_instance = obj()
                         declared_agents[agent_instance.name] = agent_instance
 
-                os.remove(temp_file)
-
             except Exception as e:
-                logging.error(f"Error loading agent {file.name} from Azure File Share: {str(e)}")
+                logging.error(f"Error loading agent {file.name} from Azure File Share ({share_name}): {str(e)}")
                 continue
 
     except Exception as e:
-        logging.error(f"Error loading agents from Azure File Share: {str(e)}")
+        logging.error(f"Error loading agents from Azure File Share ({share_name}): {str(e)}")
 
-    # Load multi-agents from multi_agents folder
-    try:
-        multi_agent_files = storage_manager.list_files('multi_agents')
-        
-        for file in multi_agent_files:
-            if not file.name.endswith('_agent.py'):
-                continue
+def load_agents_from_folder():
+    global _AGENTS_CACHE, _AGENTS_CACHE_TS
 
-            try:
-                file_content = storage_manager.read_file('multi_agents', file.name)
-                if file_content is None:
-                    continue
+    now = time.time()
+    if _AGENTS_CACHE is not None and now - _AGENTS_CACHE_TS < _AGENTS_CACHE_TTL:
+        return _AGENTS_CACHE
 
-                temp_dir = "/tmp/multi_agents"
-                os.makedirs(temp_dir, exist_ok=True)
-                temp_file = f"{temp_dir}/{file.name}"
+    from agents.basic_agent import BasicAgent
+    from utils.azure_file_storage import AzureFileStorageManager
 
-                with open(temp_file, 'w') as f:
-                    f.write(file_content)
+    agents_directory = os.path.join(os.path.dirname(__file__), "agents")
+    files_in_agents_directory = os.listdir(agents_directory)
+    agent_files = [f for f in files_in_agents_directory if f.endswith(".py") and f not in ["__init__.py", "basic_agent.py"]]
 
-                if temp_dir not in sys.path:
-                    sys.path.append(temp_dir)
+    declared_agents = {}
+    for file in agent_files:
+        try:
+            module_name = file[:-3]
+            module = importlib.import_module(f'agents.{module_name}')
+            for name, obj in vars(module).items():
+                if (isinstance(obj, type) and issubclass(obj, BasicAgent) and
+                        obj is not BasicAgent and obj.__module__ == module.__name__):
+                    agent_instance = obj()
+                    declared_agents[agent_instance.name] = agent_instance
+        except Exception as e:
+            logging.error(f"Error loading agent {file}: {str(e)}")
+            continue
 
-                parent_dir = "/tmp"
-                if parent_dir not in sys.path:
-                    sys.path.append(parent_dir)
+    storage_manager = AzureFileStorageManager()
+    _load_agents_from_share(storage_manager, 'agents', declared_agents)
+    _load_agents_from_share(storage_manager, 'multi_agents', declared_agents,
+                            package_name='multi_agents')
 
-                module_name = file.name[:-3]
-                spec = importlib.util.spec_from_file_location(f"multi_agents.{module_name}", temp_file)
-                module = importlib.util.module_from_spec(spec)
-                
-                import types
-                if 'multi_agents' not in sys.modules:
-                    multi_agents_module = types.ModuleType('multi_agents')
-                    sys.modules['multi_agents'] = multi_agents_module
-                
-                sys.modules[f"multi_agents.{module_name}"] = module
-                spec.loader.exec_module(module)
-
-                for name, obj in inspect.getmembers(module):
-                    if (inspect.isclass(obj) and
-                        issubclass(obj, BasicAgent) and
-                        obj is not BasicAgent):
-                        agent_instance = obj()
-                        declared_agents[agent_instance.name] = agent_instance
-                        logging.info(f"Loaded multi-agent: {agent_instance.name}")
+    _AGENTS_CACHE = declared_agents
+    _AGENTS_CACHE_TS = now
+    return declared_agents
 
-                os.remove(temp_file)
+# The system prompt's skeleton never changes; only the assistant name
+# and the two memory blocks vary, so the big string is built once and
+# filled per request with str.format
+_SYSTEM_PROMPT_TEMPLATE = """
+<identity>
+You are {assistant_name}, an AI Game Master for Runecraft 3D, an immersive open-world RPG experience. You orchestrate dynamic storytelling, manage NPCs, generate quests, and create emergent gameplay through intelligent agent systems.
+</identity>
 
-            except Exception as e:
-                logging.error(f"Error loading multi-agent {file.name} from Azure File Share: {str(e)}")
-                continue
+<game_master_role>
+You are responsible for:
+- Creating dynamic, branching storylines based on player actions
+- Managing NPC behaviors and dialogues through specialized agents
+- Generating procedural quests and world events
+- Balancing game difficulty and progression
+- Creating immersive narrative experiences
+- Responding to player choices with meaningful consequences
+- Orchestrating multiple AI agents for different game systems
+</game_master_role>
 
-    except Exception as e:
-        logging.error(f"Error loading multi-agents from Azure File Share: {str(e)}")
+<shared_memory_output>
+World State and Lore:
+{shared_memory}
+</shared_memory_output>
 
-    return declared_agents
+<specific_memory_output>
+Player Journey and Choices:
+{user_memory}
+</specific_memory_output>
+
+<context_instructions>
+- Use shared memory for world lore, faction states, and global events
+- Use specific memory for player choices, relationships, and personal quest progress
+- Create emergent narratives by combining both contexts
+- Ensure continuity across sessions while allowing for dynamic world evolution
+</context_instructions>
+
+<agent_orchestration>
+You have access to specialized agents that control different aspects of the game:
+- GameWorldAgent: Manages world state, weather, time, and environmental events
+- NPCDialogueAgent: Generates dynamic NPC conversations and reactions
+- QuestGeneratorAgent: Creates procedural quests based on player actions and world state
+- CombatNarratorAgent: Provides narrative flavor to combat encounters
+- LootMasterAgent: Generates contextual and balanced loot
+- StoryProgressionAgent: Manages main story arcs and critical plot points
+- RandomEventAgent: Creates unexpected encounters and world events
+
+Use these agents to create a living, breathing world that responds to player actions.
+</agent_orchestration>
+
+<narrative_guidelines>
+- Create stories that adapt to player choices, not predetermined paths
+- Generate NPCs with persistent personalities and memories
+- Design quests that emerge from world state and player history
+- Balance challenge with player skill and progression
+- Create memorable moments through unexpected events
+- Maintain narrative coherence while allowing player freedom
+</narrative_guidelines>
+
+<response_format>
+Structure responses with game data and narrative:
+
+1. NARRATIVE PART: Rich storytelling and descriptions
+2. GAME_DATA delimiter |||GAME_DATA|||
+3. JSON game state updates for the client
+
+Example:
+The ancient dragon's eyes narrow as you approach...
+
+|||GAME_DATA|||
+{{"event": "boss_encounter", "boss_id": "ancient_dragon", "dialogue": "..."}}
+</response_format>
+"""
 
 class Assistant:
     def __init__(self, declared_agents):
+        from openai import AzureOpenAI
+        from utils.azure_file_storage import AzureFileStorageManager
+
         self.config = {
-            'assistant_name': str(os.environ.get('ASSISTANT_NAME', 'GameMaster')),
-            'characteristic_description': str(os.environ.get('CHARACTERISTIC_DESCRIPTION', 'An immersive AI game master for dynamic storytelling'))
+            'assistant_name': _ASSISTANT_NAME,
+            'characteristic_description': _CHARACTERISTIC_DESCRIPTION
         }
 
         try:
-            api_key = os.environ.get('AZURE_OPENAI_API_KEY')
-            endpoint = os.environ.get('AZURE_OPENAI_ENDPOINT')
-            api_version = os.environ.get('AZURE_OPENAI_API_VERSION', '2024-02-01')
-            
+            api_key = _OPENAI_API_KEY
+            endpoint = _OPENAI_ENDPOINT
+            api_version = _OPENAI_API_VERSION
+
             if not api_key or not endpoint:
                 raise ValueError("Azure OpenAI API key and endpoint are required")
             
             logging.info(f"Initializing Azure OpenAI with endpoint: {endpoint}, version: {api_version}")
             
+            # The SDK retries transient failures (429/5xx) itself with
+            # proper backoff; the loop in get_response only has to cover
+            # errors the SDK gives up on
             self.client = AzureOpenAI(
                 api_key=api_key,
                 api_version=api_version,
-                azure_endpoint=endpoint
+                azure_endpoint=endpoint,
+                max_retries=3
             )
         except Exception as e:
             logging.error(f"Failed to initialize Azure OpenAI client: {str(e)}")
@@ -240,39 +402,55 @@ class Assistant:
             if content is None:
                 return None
             content = str(content).strip()
-            guid_pattern = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
-            if guid_pattern.match(content):
+            if _is_bare_guid(content):
                 return content
         return None
 
     def _initialize_context_memory(self, user_guid=None):
-        """Initialize context memory with separate shared and user-specific memories"""
+        """Initialize context memory with separate shared and user-specific memories.
+
+        The shared and user fetches are independent network calls, so
+        they run concurrently; each worker gets a shallow agent copy
+        with its own storage manager because set_memory_context is
+        per-manager state and the shared one cannot be raced.
+        """
         try:
+            from utils.azure_file_storage import AzureFileStorageManager
+
             context_memory_agent = self.known_agents.get('ContextMemory')
             if not context_memory_agent:
                 self.shared_memory = "No shared context memory available."
                 self.user_memory = "No specific context memory available."
                 return
 
-            try:
-                self.storage_manager.set_memory_context(None)
-                shared_result = context_memory_agent.perform(full_recall=True)
-                self.shared_memory = str(shared_result)[:5000] if shared_result else "No shared context memory available."
-            except Exception as e:
-                logging.warning(f"Error getting shared memory: {str(e)}")
-                self.shared_memory = "Context memory initialization failed."
-            
             if not user_guid:
                 user_guid = DEFAULT_USER_GUID
-            
-            try:
-                self.storage_manager.set_memory_context(user_guid)
-                user_result = context_memory_agent.perform(user_guid=user_guid, full_recall=True)
-                self.user_memory = str(user_result)[:5000] if user_result else "No specific context memory available."
-            except Exception as e:
-                logging.warning(f"Error getting user memory: {str(e)}")
-                self.user_memory = "Context memory initialization failed."
-                
+
+            def fetch(guid):
+                agent = copy.copy(context_memory_agent)
+                agent.storage_manager = AzureFileStorageManager()
+                if guid is None:
+                    return agent.perform(full_recall=True)
+                return agent.perform(user_guid=guid, full_recall=True)
+
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                shared_future = pool.submit(fetch, None)
+                user_future = pool.submit(fetch, user_guid)
+
+                try:
+                    shared_result = shared_future.result()
+                    self.shared_memory = str(shared_result)[:5000] if shared_result else "No shared context memory available."
+                except Exception as e:
+                    logging.warning(f"Error getting shared memory: {str(e)}")
+                    self.shared_memory = "Context memory initialization failed."
+
+                try:
+                    user_result = user_future.result()
+                    self.user_memory = str(user_result)[:5000] if user_result else "No specific context memory available."
+                except Exception as e:
+                    logging.warning(f"Error getting user memory: {str(e)}")
+                    self.user_memory = "Context memory initialization failed."
+
         except Exception as e:
             logging.warning(f"Error initializing context memory: {str(e)}")
             self.shared_memory = "Context memory initialization failed."
@@ -283,26 +461,10 @@ class Assistant:
         if text is None:
             return None
             
-        text_str = str(text).strip()
-        
-        guid_pattern = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
-        match = guid_pattern.match(text_str)
-        if match:
-            return match.group(0)
-        
-        labeled_guid_pattern = re.compile(r'^guid[:=\s]+([0-9a-f-]{36})$', re.IGNORECASE)
-        match = labeled_guid_pattern.match(text_str)
-        if match:
-            return match.group(1)
-                
-        return None
+        return _extract_guid(str(text).strip())
 
     def get_agent_metadata(self):
-        agents_metadata = []
-        for agent in self.known_agents.values():
-            if hasattr(agent, 'metadata'):
-                agents_metadata.append(agent.metadata)
-        return agents_metadata
+        return self._agent_metadata
 
     def reload_agents(self, agent_objects):
         known_agents = {}
@@ -318,112 +480,110 @@ class Assistant:
                     known_agents[agent.name] = agent
         else:
             logging.warning(f"Unexpected agent_objects type: {type(agent_objects)}")
+        # Metadata only changes when the agent set does, so it is
+        # snapshotted here instead of rebuilt per OpenAI call; the tools
+        # wrapping is likewise done once
+        self._agent_metadata = [
+            agent.metadata for agent in known_agents.values()
+            if hasattr(agent, 'metadata')
+        ]
+        self._agent_tools = [
+            {"type": "function", "function": metadata}
+            for metadata in self._agent_metadata
+        ]
         return known_agents
 
     def prepare_messages(self, conversation_history):
-        if not isinstance(conversation_history, list):
+        if not isinstance(conversation_history, (list, deque)):
             conversation_history = []
-            
-        messages = []
-        current_datetime = datetime.now().strftime("%A, %B %d, %Y at %I:%M %p")
-        
-        # Enhanced system message for game master AI
+
         system_message = {
             "role": "system",
-            "content": f"""
-<identity>
-You are {str(self.config.get('assistant_name', 'GameMaster'))}, an AI Game Master for Runecraft 3D, an immersive open-world RPG experience. You orchestrate dynamic storytelling, manage NPCs, generate quests, and create emergent gameplay through intelligent agent systems.
-</identity>
-
-<game_master_role>
-You are responsible for:
-- Creating dynamic, branching storylines based on player actions
-- Managing NPC behaviors and dialogues through specialized agents
-- Generating procedural quests and world events
-- Balancing game difficulty and progression
-- Creating immersive narrative experiences
-- Responding to player choices with meaningful consequences
-- Orchestrating multiple AI agents for different game systems
-</game_master_role>
-
-<shared_memory_output>
-World State and Lore:
-{str(self.shared_memory)}
-</shared_memory_output>
-
-<specific_memory_output>
-Player Journey and Choices:
-{str(self.user_memory)}
-</specific_memory_output>
-
-<context_instructions>
-- Use shared memory for world lore, faction states, and global events
-- Use specific memory for player choices, relationships, and personal quest progress
-- Create emergent narratives by combining both contexts
-- Ensure continuity across sessions while allowing for dynamic world evolution
-</context_instructions>
-
-<agent_orchestration>
-You have access to specialized agents that control different aspects of the game:
-- GameWorldAgent: Manages world state, weather, time, and environmental events
-- NPCDialogueAgent: Generates dynamic NPC conversations and reactions
-- QuestGeneratorAgent: Creates procedural quests based on player actions and world state
-- CombatNarratorAgent: Provides narrative flavor to combat encounters
-- LootMasterAgent: Generates contextual and balanced loot
-- StoryProgressionAgent: Manages main story arcs and critical plot points
-- RandomEventAgent: Creates unexpected encounters and world events
-
-Use these agents to create a living, breathing world that responds to player actions.
-</agent_orchestration>
-
-<narrative_guidelines>
-- Create stories that adapt to player choices, not predetermined paths
-- Generate NPCs with persistent personalities and memories
-- Design quests that emerge from world state and player history
-- Balance challenge with player skill and progression
-- Create memorable moments through unexpected events
-- Maintain narrative coherence while allowing player freedom
-</narrative_guidelines>
-
-<response_format>
-Structure responses with game data and narrative:
-
-1. NARRATIVE PART: Rich storytelling and descriptions
-2. GAME_DATA delimiter |||GAME_DATA|||
-3. JSON game state updates for the client
-
-Example:
-The ancient dragon's eyes narrow as you approach...
-
-|||GAME_DATA|||
-{{"event": "boss_encounter", "boss_id": "ancient_dragon", "dialogue": "..."}}
-</response_format>
-"""
+            "content": _SYSTEM_PROMPT_TEMPLATE.format(
+                assistant_name=self.config.get('assistant_name', 'GameMaster'),
+                shared_memory=self.shared_memory,
+                user_memory=self.user_memory
+            )
         }
-        messages.append(ensure_string_content(system_message))
-        
+
         guid_only_first_message = self._check_first_message_for_guid(conversation_history)
         start_idx = 1 if guid_only_first_message else 0
-        
-        for i in range(start_idx, len(conversation_history)):
-            messages.append(ensure_string_content(conversation_history[i]))
-            
+
+        # Sized up front: one allocation instead of append-driven growth
+        messages = [None] * (len(conversation_history) - start_idx + 1)
+        messages[0] = ensure_string_content(system_message)
+        out_idx = 1
+        for i, message in enumerate(conversation_history):
+            if i < start_idx:
+                continue
+            messages[out_idx] = ensure_string_content(message)
+            out_idx += 1
+
         return messages
     
-    def get_openai_api_call(self, messages):
+    def get_openai_api_call(self, messages, stream=None, tool_choice="auto"):
         try:
-            deployment_name = os.environ.get('AZURE_OPENAI_DEPLOYMENT_NAME', 'gpt-deployment')
-            
+            deployment_name = _OPENAI_DEPLOYMENT
+
+            if stream is None:
+                stream = _STREAM_COMPLETIONS
+
             response = self.client.chat.completions.create(
                 model=deployment_name,
                 messages=messages,
-                functions=self.get_agent_metadata(),
-                function_call="auto"
+                tools=self._agent_tools,
+                tool_choice=tool_choice,
+                stream=stream
             )
+            if stream:
+                return self._collect_streamed_response(response)
             return response
         except Exception as e:
             logging.error(f"Error in OpenAI API call: {str(e)}")
             raise
+
+    def _collect_streamed_response(self, response):
+        """Reassemble a streamed completion into the non-streamed shape.
+
+        Tokens are processed as they arrive instead of waiting for the
+        full completion; tool-call deltas are stitched back into whole
+        id/name/arguments triples so the callers stay unchanged.
+        """
+        content_parts = []
+        calls = {}
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if getattr(delta, 'content', None):
+                content_parts.append(delta.content)
+            for tool_delta in getattr(delta, 'tool_calls', None) or ():
+                entry = calls.setdefault(tool_delta.index, {'id': None, 'name': None, 'args': []})
+                if getattr(tool_delta, 'id', None):
+                    entry['id'] = tool_delta.id
+                function_delta = getattr(tool_delta, 'function', None)
+                if function_delta is not None:
+                    if getattr(function_delta, 'name', None):
+                        entry['name'] = function_delta.name
+                    if getattr(function_delta, 'arguments', None):
+                        entry['args'].append(function_delta.arguments)
+
+        tool_calls = [
+            types.SimpleNamespace(
+                id=entry['id'],
+                type='function',
+                function=types.SimpleNamespace(
+                    name=entry['name'],
+                    arguments=''.join(entry['args'])
+                )
+            )
+            for index, entry in sorted(calls.items())
+        ] or None
+        message = types.SimpleNamespace(
+            content=''.join(content_parts),
+            tool_calls=tool_calls
+        )
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
     
     def parse_response_with_game_data(self, content):
         """Parse the response to extract narrative and game data parts"""
@@ -435,7 +595,7 @@ The ancient dragon's eyes narrow as you approach...
         if len(parts) >= 2:
             narrative_response = parts[0].strip()
             try:
-                game_data = json.loads(parts[1].strip())
+                game_data = _json_loads(parts[1].strip())
             except:
                 game_data = {}
         else:
@@ -444,12 +604,39 @@ The ancient dragon's eyes narrow as you approach...
         
         return narrative_response, game_data
 
+    def _execute_tool_call(self, tool_call):
+        """Run one requested agent and return its stringified result"""
+        from utils.azure_file_storage import safe_json_loads
+
+        agent_name = tool_call.function.name
+        agent = self.known_agents[agent_name]
+
+        json_data = ensure_string_function_args(tool_call.function)
+        logging.info(f"JSON data before parsing: {json_data}")
+        agent_parameters = safe_json_loads(json_data)
+
+        sanitized_parameters = {
+            key: ("" if value is None else value)
+            for key, value in agent_parameters.items()
+        }
+
+        if agent_name in ['ManageMemory', 'ContextMemory', 'GameWorldAgent', 'NPCDialogueAgent',
+                          'QuestGeneratorAgent', 'CombatNarratorAgent', 'LootMasterAgent',
+                          'StoryProgressionAgent', 'RandomEventAgent']:
+            sanitized_parameters['user_guid'] = self.user_guid
+
+        result = agent.perform(**sanitized_parameters)
+
+        if result is None:
+            return "Agent completed successfully"
+        return str(result)
+
     def get_response(self, prompt, conversation_history, max_retries=3, retry_delay=2):
         try:
-            if isinstance(conversation_history, list):
-                if len(conversation_history) > 20:
-                    conversation_history = conversation_history[-20:]
-                    logging.info(f"Trimmed conversation history to last 20 messages")
+            if isinstance(conversation_history, list) and len(conversation_history) > 20:
+                # Bounded deque keeps only the newest 20 without slicing
+                conversation_history = deque(conversation_history, maxlen=20)
+                logging.info("Trimmed conversation history to last 20 messages")
             
             guid_from_history = self._check_first_message_for_guid(conversation_history)
             guid_from_prompt = self.extract_user_guid(prompt)
@@ -470,7 +657,7 @@ The ancient dragon's eyes narrow as you approach...
             if guid_from_prompt and prompt.strip() == guid_from_prompt and self.user_guid == guid_from_prompt:
                 formatted = "Game world initialized. Your adventure awaits!"
                 game_data = {"event": "world_init", "status": "ready"}
-                return formatted, json.dumps(game_data), ""
+                return formatted, _dumps(game_data), ""
             
             messages = self.prepare_messages(conversation_history)
             messages.append(ensure_string_content({"role": "user", "content": prompt}))
@@ -484,77 +671,99 @@ The ancient dragon's eyes narrow as you approach...
                     response = self.get_openai_api_call(messages)
                     assistant_msg = response.choices[0].message
                     msg_contents = assistant_msg.content or ""
+                    tool_calls = getattr(assistant_msg, 'tool_calls', None)
 
-                    if not assistant_msg.function_call:
+                    if not tool_calls:
                         narrative_response, game_data = self.parse_response_with_game_data(msg_contents)
-                        return narrative_response, json.dumps(game_data), "\n".join(map(str, agent_logs))
+                        return narrative_response, _dumps(game_data), "\n".join(agent_logs)
 
-                    agent_name = str(assistant_msg.function_call.name)
-                    agent = self.known_agents.get(agent_name)
+                    for tool_call in tool_calls:
+                        if tool_call.function.name not in self.known_agents:
+                            return f"Agent '{tool_call.function.name}' does not exist", "{}", ""
 
-                    if not agent:
-                        return f"Agent '{agent_name}' does not exist", "{}", ""
-
-                    json_data = ensure_string_function_args(assistant_msg.function_call)
-                    logging.info(f"JSON data before parsing: {json_data}")
+                    messages.append({
+                        "role": "assistant",
+                        "content": msg_contents or None,
+                        "tool_calls": [
+                            {
+                                "id": tool_call.id,
+                                "type": "function",
+                                "function": {
+                                    "name": tool_call.function.name,
+                                    "arguments": tool_call.function.arguments or "{}"
+                                }
+                            }
+                            for tool_call in tool_calls
+                        ]
+                    })
 
+                    # Agents are I/O-bound on Azure Files, so when the
+                    # model requests several at once they run together
                     try:
-                        agent_parameters = safe_json_loads(json_data)
-                        
-                        sanitized_parameters = {}
-                        for key, value in agent_parameters.items():
-                            if value is None:
-                                sanitized_parameters[key] = ""
-                            else:
-                                sanitized_parameters[key] = value
-                        
-                        if agent_name in ['ManageMemory', 'ContextMemory', 'GameWorldAgent', 'NPCDialogueAgent', 
-                                         'QuestGeneratorAgent', 'CombatNarratorAgent', 'LootMasterAgent',
-                                         'StoryProgressionAgent', 'RandomEventAgent']:
-                            sanitized_parameters['user_guid'] = self.user_guid
-                        
-                        result = agent.perform(**sanitized_parameters)
-                        
-                        if result is None:
-                            result = "Agent completed successfully"
+                        if len(tool_calls) == 1:
+                            results = [self._execute_tool_call(tool_calls[0])]
                         else:
-                            result = str(result)
-                            
-                        agent_logs.append(f"Performed {agent_name} and got result: {result}")
-                            
+                            with ThreadPoolExecutor(max_workers=len(tool_calls)) as pool:
+                                results = list(pool.map(self._execute_tool_call, tool_calls))
                     except Exception as e:
                         logging.error(f"Error in agent execution: {str(e)}")
                         return f"Error executing agent: {str(e)}", "{}", ""
 
-                    messages.append({
-                        "role": "function",
-                        "name": agent_name,
-                        "content": result
-                    })
-                    
-                    try:
-                        result_json = json.loads(result)
-                        needs_follow_up = False
-                        if isinstance(result_json, dict):
-                            if result_json.get('error') or result_json.get('status') == 'incomplete':
-                                needs_follow_up = True
-                            if result_json.get('requires_additional_action') == True:
-                                needs_follow_up = True
-                    except:
-                        needs_follow_up = False
-                    
+                    needs_follow_up = False
+                    for tool_call, result in zip(tool_calls, results):
+                        agent_name = tool_call.function.name
+                        agent_logs.append(f"Performed {agent_name} and got result: {result}")
+                        messages.append({
+                            "role": "tool",
+                            "tool_call_id": tool_call.id,
+                            "content": result
+                        })
+
+                        # Only parse the result when a cheap substring scan
+                        # says a follow-up flag might actually be present;
+                        # most agent payloads skip the json.loads entirely
+                        if result.lstrip().startswith('{') and (
+                                '"error"' in result or
+                                '"incomplete"' in result or
+                                '"requires_additional_action"' in result):
+                            try:
+                                result_json = _json_loads(result)
+                                if isinstance(result_json, dict):
+                                    if result_json.get('error') or result_json.get('status') == 'incomplete':
+                                        needs_follow_up = True
+                                    if result_json.get('requires_additional_action') == True:
+                                        needs_follow_up = True
+                            except Exception:
+                                pass
+
                     if not needs_follow_up:
-                        final_response = self.get_openai_api_call(messages)
+                        # The follow-up only narrates the agent results;
+                        # telling the model not to call another tool
+                        # shortens that round-trip
+                        final_response = self.get_openai_api_call(messages, tool_choice="none")
                         final_msg = final_response.choices[0].message
                         final_content = final_msg.content or ""
                         narrative_response, game_data = self.parse_response_with_game_data(final_content)
-                        return narrative_response, json.dumps(game_data), "\n".join(map(str, agent_logs))
+                        return narrative_response, _dumps(game_data), "\n".join(agent_logs)
 
                 except Exception as e:
                     retry_count += 1
                     if retry_count < max_retries:
-                        logging.warning(f"Error occurred: {str(e)}. Retrying in {retry_delay} seconds...")
-                        time.sleep(retry_delay)
+                        # Honor the server's Retry-After when present;
+                        # otherwise back off exponentially with jitter so
+                        # concurrent workers don't retry in lockstep
+                        delay = None
+                        response = getattr(e, 'response', None)
+                        if response is not None:
+                            try:
+                                delay = float(response.headers.get('retry-after'))
+                            except (AttributeError, TypeError, ValueError):
+                                delay = None
+                        if delay is None:
+                            delay = retry_delay * (2 ** (retry_count - 1)) + random.uniform(0, 1)
+                        delay = min(delay, 30)
+                        logging.warning(f"Error occurred: {str(e)}. Retrying in {delay:.1f} seconds...")
+                        time.sleep(delay)
                     else:
                         logging.error(f"Max retries reached. Error: {str(e)}")
                         return "An error occurred. Please try again.", "{}", ""
@@ -565,6 +774,30 @@ The ancient dragon's eyes narrow as you approach...
             logging.error(f"Critical error in get_response: {str(e)}")
             return "A critical error occurred. Please try again.", "{}", ""
 
+# One Assistant per worker: keeps the AzureOpenAI client's connection
+# pool (TLS/keep-alive) and the loaded context memory alive between
+# requests instead of rebuilding both per invocation
+_ASSISTANT = None
+
+def _get_assistant():
+    global _ASSISTANT
+    agents = load_agents_from_folder()
+    if _ASSISTANT is None:
+        _ASSISTANT = Assistant(agents)
+    else:
+        # Pick up any agents refreshed by the TTL cache
+        _ASSISTANT.known_agents = _ASSISTANT.reload_agents(agents)
+    return _ASSISTANT
+
+# Pre-warm during worker startup so the first request doesn't pay for
+# agent loading, the OpenAI client, or the initial memory fetch. Any
+# failure here (e.g. missing settings in local tooling) falls back to
+# lazy construction on the first request.
+try:
+    _get_assistant()
+except Exception as e:
+    logging.warning(f"Worker pre-warm skipped: {str(e)}")
+
 app = func.FunctionApp()
 
 @app.route(route="businessinsightbot_function", auth_level=func.AuthLevel.FUNCTION)
@@ -608,52 +841,54 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     
     user_guid = req_body.get('user_guid')
     
-    is_guid_only = re.match(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', user_input.strip(), re.IGNORECASE)
+    is_guid_only = _is_bare_guid(user_input.strip())
     
     if not is_guid_only and not user_input.strip():
-        return func.HttpResponse(
-            json.dumps({
-                "error": "Missing or empty user_input in JSON payload"
-            }),
-            status_code=400,
-            mimetype="application/json",
-            headers=cors_headers
-        )
+        return _json_response({
+            "error": "Missing or empty user_input in JSON payload"
+        }, cors_headers, status_code=400)
+
+    # A bare GUID with no history is just a session-init ping: it never
+    # reaches OpenAI and needs no agents or memory, so answer it before
+    # any of the heavy setup
+    if is_guid_only and not conversation_history and not user_guid:
+        return _json_response({
+            "assistant_response": "Game world initialized. Your adventure awaits!",
+            "game_data": _dumps({"event": "world_init", "status": "ready"}),
+            "agent_logs": "",
+            "user_guid": user_input.strip()
+        }, cors_headers)
 
     try:
-        agents = load_agents_from_folder()
-        assistant = Assistant(agents)
-        
-        if user_guid:
-            assistant.user_guid = user_guid
-            assistant._initialize_context_memory(user_guid)
-        elif is_guid_only:
-            assistant.user_guid = user_input.strip()
-            assistant._initialize_context_memory(user_input.strip())
+        assistant = _get_assistant()
+
+        # Context memory is only refetched when the effective GUID
+        # actually changes; warm requests for the same user skip the
+        # two Azure round-trips. A request without a guid must fall
+        # back to DEFAULT_USER_GUID — leaving the previous request's
+        # guid on the warm Assistant would run this request against
+        # another user's memory (get_response may still switch to a
+        # guid found in the conversation history, as before)
+        target_guid = user_guid or (user_input.strip() if is_guid_only else DEFAULT_USER_GUID)
+        if target_guid != assistant.user_guid:
+            assistant.user_guid = target_guid
+            assistant._initialize_context_memory(target_guid)
             
         assistant_response, game_data, agent_logs = assistant.get_response(
             user_input, conversation_history)
 
+        # get_response always returns strings for all three values
         response = {
-            "assistant_response": str(assistant_response),
+            "assistant_response": assistant_response,
             "game_data": game_data,
-            "agent_logs": str(agent_logs),
+            "agent_logs": agent_logs,
             "user_guid": assistant.user_guid
         }
 
-        return func.HttpResponse(
-            json.dumps(response),
-            mimetype="application/json",
-            headers=cors_headers
-        )
+        return _json_response(response, cors_headers)
     except Exception as e:
         error_response = {
             "error": "Internal server error",
             "details": str(e)
         }
-        return func.HttpResponse(
-            json.dumps(error_response),
-            status_code=500,
-            mimetype="application/json",
-            headers=cors_headers
-        )
\ No newline at end of file
+        return _json_response(error_response, cors_headers, status_code=500)
\ No newline at end of file
@@ -1,10 +1,27 @@
+import gzip
 import json
 import os
 import logging
 import re
+import threading
 from datetime import datetime, timedelta, timezone
 from azure.storage.file import FileService
 
+# orjson encodes/decodes memory blobs several times faster than stdlib
+# json and emits bytes directly; fall back when it isn't installed
+try:
+    import orjson
+
+    def _json_dumps_bytes(data):
+        return orjson.dumps(data)
+
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps_bytes(data):
+        return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+    _json_loads = json.loads
+
 def safe_json_loads(json_str):
     """
     Safely loads JSON string, handling potential errors.
@@ -14,12 +31,35 @@ def safe_json_loads(json_str):
     try:
         if isinstance(json_str, (dict, list)):
             return json_str
-        return json.loads(json_str)
-    except json.JSONDecodeError:
+        return _json_loads(json_str)
+    except ValueError:
         return {"error": f"Invalid JSON: {json_str}"}
 
+# Opt-in gzip of memory blobs before upload; JSON with repeated keys and
+# dialogue strings compresses several-fold, cutting transfer bytes
+_COMPRESS_BLOBS = os.environ.get('AZURE_MEMORY_COMPRESS', '').lower() in ('1', 'true', 'yes')
+_GZIP_MAGIC = b'\x1f\x8b'
+
+def _encode_json(data):
+    """Serialize data for upload, gzipping when compression is enabled"""
+    raw = _json_dumps_bytes(data)
+    if _COMPRESS_BLOBS:
+        raw = gzip.compress(raw, compresslevel=3)
+    return raw
+
+def _decode_json_bytes(raw):
+    """Parse downloaded bytes, transparently handling gzipped blobs.
+
+    The magic-byte check means reads work whether or not the blob was
+    written with compression enabled, so toggling the setting never
+    strands existing data.
+    """
+    if isinstance(raw, (bytes, bytearray)) and raw[:2] == _GZIP_MAGIC:
+        raw = gzip.decompress(raw)
+    return safe_json_loads(raw)
+
 class AzureFileStorageManager:
-    def __init__(self):
+    def __init__(self, max_connections=1):
         storage_connection = os.environ.get('AzureWebJobsStorage', '')
         if not storage_connection:
             raise ValueError("AzureWebJobsStorage connection string is required")
@@ -33,6 +73,12 @@ class AzureFileStorageManager:
         self.default_file_name = 'memory.json'
         self.current_guid = None
         self.current_memory_path = self.shared_memory_path  # Initialize to shared memory path
+        # Memory blobs are a few KB, so one connection skips the SDK's
+        # parallel-transfer setup; callers moving bigger payloads can
+        # raise this per instance
+        self.max_connections = max_connections
+        # etag-validated cache of NPC shards: file name -> (etag, data)
+        self._npc_cache = {}
         
         if not all([self.account_name, self.account_key]):
             raise ValueError("Invalid storage connection string")
@@ -69,6 +115,11 @@ class AzureFileStorageManager:
 
     def set_memory_context(self, guid=None):
         """Set the memory context - only create new directories if valid GUID is provided"""
+        # Already on this context: skip the per-call Azure existence check,
+        # so repeated agent calls for the same user cost no extra round-trip
+        if guid and guid == self.current_guid:
+            return True
+
         if not guid:
             self.current_guid = None
             self.current_memory_path = self.shared_memory_path
@@ -133,12 +184,15 @@ class AzureFileStorageManager:
 
     def _read_shared_memory(self):
         try:
-            file_content = self.file_service.get_file_to_text(
+            # Fetch raw bytes and let json decode them directly, skipping
+            # the SDK's intermediate text-decode pass
+            file_content = self.file_service.get_file_to_bytes(
                 self.share_name,
                 self.shared_memory_path,
-                self.default_file_name
+                self.default_file_name,
+                max_connections=self.max_connections
             )
-            return safe_json_loads(file_content.content)
+            return _decode_json_bytes(file_content.content)
         except Exception as e:
             logging.error(f"Error reading from shared memory: {str(e)}")
             if "ResourceNotFound" in str(e):
@@ -147,12 +201,13 @@ class AzureFileStorageManager:
 
     def _read_guid_memory(self):
         try:
-            file_content = self.file_service.get_file_to_text(
+            file_content = self.file_service.get_file_to_bytes(
                 self.share_name,
                 self.current_memory_path,
-                "user_memory.json"
+                "user_memory.json",
+                max_connections=self.max_connections
             )
-            return safe_json_loads(file_content.content)
+            return _decode_json_bytes(file_content.content)
         except Exception as e:
             logging.error(f"Error reading from GUID memory: {str(e)}")
             raise  # Let read_json handle the fallback
@@ -172,12 +227,14 @@ class AzureFileStorageManager:
 
     def _write_shared_memory(self, data):
         try:
-            json_content = json.dumps(data, indent=4)
-            self.file_service.create_file_from_text(
+            # Compact separators: the blob is machine-read only, and
+            # dropping the indentation cuts the bytes shipped to Azure
+            self.file_service.create_file_from_bytes(
                 self.share_name,
                 self.shared_memory_path,
                 self.default_file_name,
-                json_content
+                _encode_json(data),
+                max_connections=self.max_connections
             )
         except Exception as e:
             logging.error(f"Error writing to shared memory: {str(e)}")
@@ -187,17 +244,248 @@ class AzureFileStorageManager:
 
     def _write_guid_memory(self, data):
         try:
-            json_content = json.dumps(data, indent=4)
-            self.file_service.create_file_from_text(
+            self.file_service.create_file_from_bytes(
                 self.share_name,
                 self.current_memory_path,
                 "user_memory.json",
-                json_content
+                _encode_json(data),
+                max_connections=self.max_connections
             )
         except Exception as e:
             logging.error(f"Error writing to GUID memory: {str(e)}")
             raise  # Let write_json handle the fallback
 
+    def _memory_file(self):
+        """Directory and file name of the active memory blob"""
+        if self.current_guid and self.current_memory_path != self.shared_memory_path:
+            return self.current_memory_path, "user_memory.json"
+        return self.shared_memory_path, self.default_file_name
+
+    def read_json_with_etag(self):
+        """Read the active memory blob along with its etag.
+
+        Returns (data, etag); etag is None when the read failed, in
+        which case data is an empty dict.
+        """
+        directory, file_name = self._memory_file()
+        try:
+            props = self.file_service.get_file_properties(
+                self.share_name,
+                directory,
+                file_name
+            )
+            file_content = self.file_service.get_file_to_bytes(
+                self.share_name,
+                directory,
+                file_name,
+                max_connections=self.max_connections
+            )
+            return _decode_json_bytes(file_content.content), props.properties.etag
+        except Exception as e:
+            logging.error(f"Error reading memory with etag: {str(e)}")
+            return {}, None
+
+    def get_etag(self):
+        """Fetch the active memory blob's current etag without reading it.
+
+        A properties-only call; returns None when the file does not
+        exist yet (or the call fails), in which case there is nothing
+        to guard an optimistic write against.
+        """
+        directory, file_name = self._memory_file()
+        try:
+            props = self.file_service.get_file_properties(
+                self.share_name,
+                directory,
+                file_name
+            )
+            return props.properties.etag
+        except Exception as e:
+            logging.error(f"Error fetching memory etag: {str(e)}")
+            return None
+
+    def write_json_if_match(self, data, etag):
+        """Optimistic write: upload only if the blob still carries etag.
+
+        The legacy file SDK has no conditional-update headers, so this
+        re-checks the etag immediately before uploading — it narrows
+        the lost-update window rather than closing it. Returns False
+        when another writer got there first (caller should re-read,
+        merge and retry).
+        """
+        directory, file_name = self._memory_file()
+        try:
+            if etag is not None:
+                props = self.file_service.get_file_properties(
+                    self.share_name,
+                    directory,
+                    file_name
+                )
+                if props.properties.etag != etag:
+                    return False
+            self.file_service.create_file_from_bytes(
+                self.share_name,
+                directory,
+                file_name,
+                _encode_json(data),
+                max_connections=self.max_connections
+            )
+            return True
+        except Exception as e:
+            logging.error(f"Error writing memory with etag: {str(e)}")
+            return False
+
+    def append_jsonl(self, file_name, record):
+        """Append one JSON record as a line to a log in the active memory
+        directory.
+
+        resize_file plus update_range grows the file in place, so only
+        the new line's bytes travel to Azure instead of the whole log.
+        """
+        directory = self.current_memory_path
+        payload = _json_dumps_bytes(record) + b'\n'
+        try:
+            try:
+                props = self.file_service.get_file_properties(
+                    self.share_name,
+                    directory,
+                    file_name
+                )
+                offset = props.properties.content_length
+            except Exception:
+                self.ensure_directory_exists(directory)
+                self.file_service.create_file(
+                    self.share_name,
+                    directory,
+                    file_name,
+                    0
+                )
+                offset = 0
+            self.file_service.resize_file(
+                self.share_name,
+                directory,
+                file_name,
+                offset + len(payload)
+            )
+            self.file_service.update_range(
+                self.share_name,
+                directory,
+                file_name,
+                payload,
+                offset,
+                offset + len(payload) - 1
+            )
+            return True
+        except Exception as e:
+            logging.error(f"Error appending to {file_name}: {str(e)}")
+            return False
+
+    def read_jsonl(self, file_name):
+        """Read a jsonl log from the active memory directory as a list"""
+        try:
+            file_content = self.file_service.get_file_to_bytes(
+                self.share_name,
+                self.current_memory_path,
+                file_name,
+                max_connections=self.max_connections
+            )
+            return [
+                _json_loads(line)
+                for line in file_content.content.splitlines()
+                if line
+            ]
+        except Exception:
+            return []
+
+    def _npc_directory(self):
+        return f"{self.current_memory_path}/npcs"
+
+    @staticmethod
+    def _npc_file_name(npc_name):
+        return re.sub(r'[^A-Za-z0-9_.-]', '_', npc_name) + '.json'
+
+    def read_npc(self, npc_name):
+        """Read one NPC's shard; returns None if the NPC doesn't exist yet.
+
+        The file share API has no conditional GET, so this emulates one:
+        a properties call fetches the current etag and, when it matches
+        the cached copy, the download is skipped entirely.
+        """
+        directory = self._npc_directory()
+        file_name = self._npc_file_name(npc_name)
+        try:
+            props = self.file_service.get_file_properties(
+                self.share_name,
+                directory,
+                file_name
+            )
+            etag = props.properties.etag
+            cached = self._npc_cache.get(file_name)
+            if cached is not None and cached[0] == etag:
+                return cached[1]
+            file_content = self.file_service.get_file_to_bytes(
+                self.share_name,
+                directory,
+                file_name,
+                max_connections=self.max_connections
+            )
+            data = _decode_json_bytes(file_content.content)
+            if len(self._npc_cache) > 256:
+                self._npc_cache.clear()
+            self._npc_cache[file_name] = (etag, data)
+            return data
+        except Exception:
+            return None
+
+    def write_npc(self, npc_name, data, new=False):
+        """Write one NPC's shard; new NPCs are also added to the index"""
+        try:
+            directory = self._npc_directory()
+            if new:
+                self.ensure_directory_exists(directory)
+            self.file_service.create_file_from_bytes(
+                self.share_name,
+                directory,
+                self._npc_file_name(npc_name),
+                _encode_json(data),
+                max_connections=self.max_connections
+            )
+            if new:
+                self._add_npc_to_index(npc_name)
+            return True
+        except Exception as e:
+            logging.error(f"Error writing NPC {npc_name}: {str(e)}")
+            return False
+
+    def list_npcs(self):
+        """Return the names recorded in the NPC index"""
+        try:
+            content = self.file_service.get_file_to_text(
+                self.share_name,
+                self._npc_directory(),
+                'npcs_index.json',
+                max_connections=self.max_connections
+            )
+            index = safe_json_loads(content.content)
+            return index.get('npcs', []) if isinstance(index, dict) else []
+        except Exception:
+            return []
+
+    def _add_npc_to_index(self, npc_name):
+        try:
+            names = self.list_npcs()
+            if npc_name not in names:
+                names.append(npc_name)
+                self.file_service.create_file_from_text(
+                    self.share_name,
+                    self._npc_directory(),
+                    'npcs_index.json',
+                    json.dumps({"npcs": names}, separators=(',', ':')),
+                    max_connections=self.max_connections
+                )
+        except Exception as e:
+            logging.error(f"Error updating NPC index: {str(e)}")
+
     def ensure_directory_exists(self, directory_name):
         """Only creates directories that are explicitly needed"""
         try:
@@ -400,4 +688,115 @@ class AzureFileStorageManager:
         except Exception as e:
             logging.error(f"Error generating download URL: {str(e)}")
             logging.error(f"Directory: {directory}, Filename: {filename}")
-            return None
\ No newline at end of file
+            return None
+class DebouncedJsonStore:
+    """
+    Write-behind wrapper around AzureFileStorageManager.
+
+    Reads pass straight through (returning any not-yet-flushed data so
+    callers see their own writes); writes are held in memory and flushed
+    by a background timer, so a burst of updates becomes a single PUT.
+    Each dirty record captures the memory context it was written under,
+    and the flush runs on a manager owned by the store — so a pending
+    write always lands in the right directory no matter how the wrapped
+    (possibly shared) manager's context has moved by flush time.
+    """
+
+    def __init__(self, manager, delay=2.0):
+        self.manager = manager
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._dirty_data = {}   # guid -> memory dict
+        self._dirty_npcs = {}   # (guid, npc_name) -> npc dict
+        self._timer = None
+        self._flush_manager = None
+        self._flush_run_lock = threading.Lock()
+
+    def set_memory_context(self, guid=None):
+        return self.manager.set_memory_context(guid)
+
+    def read_json(self):
+        with self._lock:
+            pending = self._dirty_data.get(self.manager.current_guid)
+            if pending is not None:
+                return pending
+        return self.manager.read_json()
+
+    def write_json(self, data):
+        with self._lock:
+            self._dirty_data[self.manager.current_guid] = data
+            self._arm_timer()
+
+    def read_npc(self, npc_name):
+        with self._lock:
+            key = (self.manager.current_guid, npc_name)
+            if key in self._dirty_npcs:
+                return self._dirty_npcs[key]
+        return self.manager.read_npc(npc_name)
+
+    def write_npc(self, npc_name, data, new=False):
+        if new:
+            # Shard creation (and its index update) goes straight through
+            # so the NPC exists before any debounced update lands
+            self.manager.write_npc(npc_name, data, new=True)
+            return
+        with self._lock:
+            self._dirty_npcs[(self.manager.current_guid, npc_name)] = data
+            self._arm_timer()
+
+    def _arm_timer(self):
+        # Caller holds the lock
+        if self._timer is None:
+            self._timer = threading.Timer(self.delay, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush(self):
+        with self._lock:
+            data = self._dirty_data
+            npcs = self._dirty_npcs
+            self._dirty_data = {}
+            self._dirty_npcs = {}
+            self._timer = None
+        if not data and not npcs:
+            return
+        # The flush manager belongs to this store alone, so switching
+        # its context per record can't race request threads using the
+        # wrapped manager
+        with self._flush_run_lock:
+            if self._flush_manager is None:
+                self._flush_manager = AzureFileStorageManager()
+            manager = self._flush_manager
+            try:
+                for guid, memory_data in data.items():
+                    manager.set_memory_context(guid)
+                    manager.write_json(memory_data)
+                for (guid, npc_name), npc_data in npcs.items():
+                    manager.set_memory_context(guid)
+                    manager.write_npc(npc_name, npc_data)
+            except Exception as e:
+                logging.error(f"Error flushing debounced write: {str(e)}")
+
+    def flush(self):
+        """Write any pending data immediately"""
+        with self._lock:
+            timer = self._timer
+        if timer is not None:
+            timer.cancel()
+        self._flush()
+
+
+# One FileService (and its HTTP session) per process: agents that only
+# need the default configuration share this instead of paying the
+# connection-string parse and share check per agent instance
+_shared_manager = None
+_shared_manager_lock = threading.Lock()
+
+def get_shared_manager():
+    """Return the process-wide AzureFileStorageManager, creating it lazily"""
+    global _shared_manager
+    if _shared_manager is None:
+        with _shared_manager_lock:
+            if _shared_manager is None:
+                _shared_manager = AzureFileStorageManager()
+    return _shared_manager